@@ -0,0 +1,137 @@
+"""
+Drive GET /item or the GraphQL plu query at a fixed concurrency and
+report throughput and latency percentiles
+
+    python -m benchmarks.loadtest --url http://localhost:8000 --items 100000 --concurrency 32 --duration 30
+
+Codes are generated the same way benchmarks.seed_catalog seeds them, so
+--items and --seed must match the seeded catalog.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Dict
+
+import httpx
+from rich.console import Console
+from rich.table import Table
+
+from .seed_catalog import ean13, item_code
+
+
+GRAPHQL_QUERY = '''
+query Plu($barcode: String!) {
+  plu(barcode: $barcode) {
+    id code name normalPrice discountedPrice
+    bulkPrices { quantity unitPrice }
+    promoPrices { promoCode unitPrice }
+  }
+}
+'''
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    nearest-rank percentile of sorted ``values``
+    """
+    if not values:
+        return 0.0
+    rank = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[rank]
+
+
+def pick_code(rng: random.Random, args: argparse.Namespace) -> str:
+    if rng.random() < args.miss_ratio:
+        return 'MISS{:08d}'.format(rng.randrange(10 ** 8))
+    # kode yang sering discan: sebagian kecil katalog menerima sebagian besar scan
+    if rng.random() < 0.8:
+        number = rng.randint(1, max(1, args.items // 10))
+    else:
+        number = rng.randint(1, args.items)
+    return ean13(number) if rng.random() < 0.9 else item_code(number)
+
+
+async def request_once(client: httpx.AsyncClient, mode: str, code: str) -> int:
+    if mode == 'graphql':
+        response = await client.post('/graphql', json={
+            'query': GRAPHQL_QUERY,
+            'variables': {'barcode': code},
+        })
+    else:
+        response = await client.get('/item', params={'code': code})
+    return response.status_code
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    rng: random.Random,
+    deadline: float,
+    latencies: List[float],
+    statuses: Dict[str, int],
+) -> None:
+    while time.perf_counter() < deadline:
+        code = pick_code(rng, args)
+        start = time.perf_counter()
+        try:
+            status = str(await request_once(client, args.mode, code))
+        except httpx.HTTPError as err:
+            status = type(err).__name__
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(args: argparse.Namespace) -> None:
+    console = Console()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        if args.warmup:
+            warmup_deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*[
+                worker(client, args, random.Random(args.seed + n), warmup_deadline, [], {})
+                for n in range(args.concurrency)
+            ])
+
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*[
+            worker(client, args, random.Random(args.seed * 1000 + n), deadline, latencies, statuses)
+            for n in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    table = Table(title='{} {} x{} for {:.1f}s'.format(args.mode, args.url, args.concurrency, elapsed))
+    for column in ['requests', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'status']:
+        table.add_column(column, justify='right')
+    table.add_row(
+        str(len(latencies)),
+        '{:.1f}'.format(len(latencies) / elapsed),
+        '{:.2f}'.format(percentile(latencies, 0.50) * 1000),
+        '{:.2f}'.format(percentile(latencies, 0.95) * 1000),
+        '{:.2f}'.format(percentile(latencies, 0.99) * 1000),
+        '{:.2f}'.format((latencies[-1] if latencies else 0.0) * 1000),
+        ', '.join('{}={}'.format(status, count) for status, count in sorted(statuses.items())),
+    )
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PLU load test')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--mode', choices=['rest', 'graphql'], default='rest')
+    parser.add_argument('--items', type=int, default=10000, help='catalog size used when seeding')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds')
+    parser.add_argument('--warmup', type=float, default=5.0, help='seconds, not measured')
+    parser.add_argument('--miss-ratio', type=float, default=0.02, help='share of unknown codes')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
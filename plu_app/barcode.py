@@ -0,0 +1,63 @@
+"""
+EAN/UPC barcode normalization.
+
+Scanners send the same product as EAN-13, UPC-A with or without its leading
+zero, or GTIN-14.  All of them are GTINs that differ only by leading zeros,
+which do not change the check digit, so a barcode with a valid check digit
+is normalized to its 14 digit form.
+"""
+from typing import Optional, List
+
+
+# 11 digit adalah UPC-A tanpa nol di depan
+GTIN_LENGTHS = (8, 11, 12, 13, 14)
+
+
+def gtin_check_digit(body: str) -> int:
+    """
+    check digit for the digits of a GTIN without its check digit
+    """
+    # bobot 3 dan 1 bergantian, dihitung dari digit paling kanan
+    total = sum(
+        int(digit) * (3 if position % 2 == 0 else 1)
+        for position, digit in enumerate(reversed(body))
+    )
+    return (10 - total % 10) % 10
+
+
+def is_valid_gtin(code: str) -> bool:
+    return (
+        len(code) in GTIN_LENGTHS
+        and code.isascii()
+        and code.isdigit()
+        and gtin_check_digit(code[:-1]) == int(code[-1])
+    )
+
+
+def normalize_barcode(code: Optional[str]) -> Optional[str]:
+    """
+    GTIN-14 form of an EAN-8, UPC-A (also keyed as 11 digits), EAN-13 or
+    GTIN-14 barcode, None if
+    ``code`` is not one of them or its check digit is wrong
+    """
+    if not code:
+        return None
+    code = code.strip()
+    if not is_valid_gtin(code):
+        return None
+    return code.zfill(14)
+
+
+def barcode_variants(code: Optional[str]) -> List[str]:
+    """
+    every form ``code`` may have been stored in, its GTIN-14 form with
+    leading zeros stripped to each GTIN length
+    """
+    gtin = normalize_barcode(code)
+    if gtin is None:
+        return []
+    return [
+        gtin[14 - length:]
+        for length in GTIN_LENGTHS
+        if gtin[:14 - length].strip('0') == ''
+    ]
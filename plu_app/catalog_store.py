@@ -0,0 +1,355 @@
+"""
+Compact columnar store of the items and grosir tiers held by the price cache.
+
+Only the fields ItemModel and ItemHargaGrosirModel expose are kept, as
+arrays of numbers sorted by IDItem, with every distinct string stored once
+in a shared string table.  Hash tables of the rows by Kode, Barcode and the
+GTIN-14 form of the barcode, and the trigram postings of the search index
+are kept in the store too, see search_index.Postings.  The whole store is one
+buffer: it can be written to a file and memory mapped, so the workers of
+one host share a single copy through the page cache instead of each holding
+its own models and index.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .barcode import normalize_barcode
+from .models import YaTidakEnum, ItemModel, ItemHargaGrosirModel
+from .search_index import Postings, PostingsBuilder
+
+
+MAGIC = b'PLUCAT3\n'
+HEADER_LENGTH = struct.Struct('<Q')
+
+ITEM_STRINGS = ('Kode', 'Nama', 'Singkatan', 'Barcode', 'KodePabrik', 'Satuan')
+ITEM_FLOATS = ('JumlahDos', 'HargaNormal', 'HargaJual')
+
+# indeks string untuk None
+NO_STRING = -1
+
+# baris kosong di tabel hash
+NO_ROW = -1
+
+# tabel hash baris per kolom kunci, lihat CatalogStore.find_key
+KEYS = {'kode': 'item.Kode', 'barcode': 'item.Barcode', 'gtin': 'item.GTIN'}
+
+# field barang yang diindeks untuk pencarian
+SearchText = namedtuple('SearchText', ('Kode', 'Nama', 'Singkatan', 'KodePabrik'))
+
+Buffer = Union[bytes, bytearray, mmap.mmap]
+
+
+def align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def key_hash(value: str) -> int:
+    # sama di semua proses, tidak seperti hash()
+    return zlib.crc32(value.encode('utf-8'))
+
+
+class CatalogBuilder:
+    """
+    Collects items and grosir tiers into columns, ``build`` returns the store
+    """
+
+    def __init__(self) -> None:
+        self.strings: Dict[str, int] = {}
+        self.columns: Dict[str, array] = {
+            'item.IDItem': array('q'),
+            'item.Aktif': array('B'),
+            **{'item.' + name: array('i') for name in ITEM_STRINGS},
+            **{'item.' + name: array('d') for name in ITEM_FLOATS},
+            'grosir.IDItemHargaGrosir': array('q'),
+            'grosir.IDItem': array('q'),
+            'grosir.Jumlah': array('d'),
+            'grosir.Harga': array('d'),
+            'grosir.IsDos': array('B'),
+        }
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def add_item(self, item: Any) -> None:
+        """
+        ``item`` is an Item row or an ItemModel
+        """
+        columns = self.columns
+        columns['item.IDItem'].append(item.IDItem)
+        columns['item.Aktif'].append(getattr(item, 'Aktif', 'Ya') == 'Ya')
+        for name in ITEM_STRINGS:
+            columns['item.' + name].append(self.intern(getattr(item, name)))
+        for name in ITEM_FLOATS:
+            value = getattr(item, name)
+            columns['item.' + name].append(math.nan if value is None else value)
+
+    def add_grosir(self, grosir: Any) -> None:
+        columns = self.columns
+        columns['grosir.IDItemHargaGrosir'].append(grosir.IDItemHargaGrosir)
+        columns['grosir.IDItem'].append(grosir.IDItem)
+        columns['grosir.Jumlah'].append(grosir.Jumlah or 0.0)
+        columns['grosir.Harga'].append(grosir.Harga or 0.0)
+        columns['grosir.IsDos'].append(grosir.IsDos == 'Ya')
+
+    def sort(self, prefix: str, key: str, *then: str) -> None:
+        keys = [self.columns[name] for name in (prefix + key,) + tuple(prefix + name for name in then)]
+        order = sorted(range(len(keys[0])), key=lambda row: tuple(column[row] for column in keys))
+        if order == list(range(len(order))):
+            return
+        for name, column in self.columns.items():
+            if name.startswith(prefix):
+                self.columns[name] = array(column.typecode, (column[row] for row in order))
+
+    def build(self, meta: Optional[Dict[str, Any]] = None) -> 'CatalogStore':
+        self.sort('item.', 'IDItem')
+        self.sort('grosir.', 'IDItem', 'Jumlah')
+        self.add_keys()
+        self.add_postings()
+
+        blob = bytearray()
+        offsets = array('q', [0])
+        for value in self.strings:
+            blob += value.encode('utf-8')
+            offsets.append(len(blob))
+
+        sections: List[Tuple[str, str, bytes]] = [
+            (name, column.typecode, column.tobytes())
+            for name, column in self.columns.items()
+        ]
+        sections.append(('strings.offsets', 'q', offsets.tobytes()))
+        sections.append(('strings.blob', 'B', bytes(blob)))
+
+        layout: Dict[str, Tuple[int, int, str]] = {}
+        offset = 0
+        for name, typecode, data in sections:
+            layout[name] = (offset, len(data), typecode)
+            offset = align(offset + len(data))
+
+        header = json.dumps({'meta': meta or {}, 'sections': layout}).encode('utf-8')
+        start = align(len(MAGIC) + HEADER_LENGTH.size + len(header))
+        buffer = bytearray(start + offset)
+        buffer[:len(MAGIC)] = MAGIC
+        HEADER_LENGTH.pack_into(buffer, len(MAGIC), len(header))
+        buffer[len(MAGIC) + HEADER_LENGTH.size:len(MAGIC) + HEADER_LENGTH.size + len(header)] = header
+        for name, _, data in sections:
+            section_offset = start + layout[name][0]
+            buffer[section_offset:section_offset + len(data)] = data
+        return CatalogStore(bytes(buffer))
+
+    def add_keys(self) -> None:
+        """
+        Hash tables with linear probing of the rows by Kode, Barcode and
+        GTIN-14, of every item active or not, at most half full
+        """
+        columns = self.columns
+        gtins = columns['item.GTIN'] = array('i')
+        strings = list(self.strings)
+        for barcode in columns['item.Barcode']:
+            gtin = None if barcode == NO_STRING else normalize_barcode(strings[barcode])
+            gtins.append(self.intern(gtin))
+
+        strings = list(self.strings)
+        size = 8
+        while size < len(gtins) * 2:
+            size *= 2
+        mask = size - 1
+        for name, column_name in KEYS.items():
+            table = array('i', [NO_ROW]) * size
+            for row, index in enumerate(columns[column_name]):
+                if index == NO_STRING or not strings[index]:
+                    continue
+                slot = key_hash(strings[index]) & mask
+                while table[slot] != NO_ROW:
+                    slot = (slot + 1) & mask
+                table[slot] = row
+            columns['keys.' + name] = table
+
+    def add_postings(self) -> None:
+        """
+        Index the active items for search, by row
+        """
+        columns = self.columns
+        strings = list(self.strings)
+
+        def text(name: str, row: int) -> Optional[str]:
+            index = columns['item.' + name][row]
+            return None if index == NO_STRING else strings[index]
+
+        postings = PostingsBuilder()
+        for row, active in enumerate(columns['item.Aktif']):
+            if active:
+                postings.add(row, SearchText(*(text(name, row) for name in SearchText._fields)))
+
+        sizes, grams, offsets, rows, codes, code_rows = postings.arrays(len(columns['item.IDItem']))
+        columns['item.Grams'] = sizes
+        columns['search.grams'] = array('i', map(self.intern, grams))
+        columns['search.offsets'] = offsets
+        columns['search.rows'] = rows
+        columns['search.codes'] = array('i', map(self.intern, codes))
+        columns['search.code_rows'] = code_rows
+
+
+class Strings(Sequence):
+    """
+    Column of string indexes read as strings
+    """
+
+    def __init__(self, store: 'CatalogStore', column: Sequence[int]) -> None:
+        self.store = store
+        self.column = column
+
+    def __len__(self) -> int:
+        return len(self.column)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.string(value) for value in self.column[index]]
+        return self.store.string(self.column[index])
+
+
+class CatalogStore:
+    """
+    Read-only view over a buffer made by CatalogBuilder, models are created
+    on access
+    """
+
+    def __init__(self, buffer: Buffer) -> None:
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError('Not a catalog store')
+        self.buffer = buffer
+        view = memoryview(buffer)
+        header_length, = HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(bytes(view[header_start:header_start + header_length]))
+        start = align(header_start + header_length)
+
+        self.meta: Dict[str, Any] = header['meta']
+        self.columns: Dict[str, memoryview] = {
+            name: view[start + offset:start + offset + length].cast(typecode)
+            for name, (offset, length, typecode) in header['sections'].items()
+        }
+        self.item_ids = self.columns['item.IDItem']
+        self.grosir_item_ids = self.columns['grosir.IDItem']
+        self.string_offsets = self.columns['strings.offsets']
+        self.blob = self.columns['strings.blob']
+
+    @classmethod
+    def empty(cls) -> 'CatalogStore':
+        return CatalogBuilder().build()
+
+    @classmethod
+    def open(cls, path: str) -> 'CatalogStore':
+        with open(path, 'rb') as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def save(self, path: str) -> None:
+        """
+        write to ``path`` atomically, workers that mapped the previous file
+        keep reading it
+        """
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'wb') as file:
+            file.write(self.buffer)
+        os.replace(temp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        return bytes(self.blob[self.string_offsets[index]:self.string_offsets[index + 1]]).decode('utf-8')
+
+    def find(self, item_id: int) -> Optional[int]:
+        row = bisect_left(self.item_ids, item_id)
+        if row < len(self.item_ids) and self.item_ids[row] == item_id:
+            return row
+        return None
+
+    def find_key(self, name: str, value: str) -> List[int]:
+        """
+        rows of the items whose key ``name`` is ``value``, see KEYS
+        """
+        table = self.columns['keys.' + name]
+        column = self.columns[KEYS[name]]
+        mask = len(table) - 1
+        slot = key_hash(value) & mask
+        rows = []
+        while table[slot] != NO_ROW:
+            row = table[slot]
+            if self.string(column[row]) == value:
+                rows.append(row)
+            slot = (slot + 1) & mask
+        return rows
+
+    def is_active(self, row: int) -> bool:
+        return bool(self.columns['item.Aktif'][row])
+
+    def item_at(self, row: int) -> ItemModel:
+        values: Dict[str, Any] = {'IDItem': self.item_ids[row]}
+        for name in ITEM_STRINGS:
+            values[name] = self.string(self.columns['item.' + name][row])
+        for name in ITEM_FLOATS:
+            value = self.columns['item.' + name][row]
+            values[name] = None if math.isnan(value) else value
+        return ItemModel.construct(**values)
+
+    def get_item(self, item_id: int) -> Optional[ItemModel]:
+        """
+        the item if it is active
+        """
+        row = self.find(item_id)
+        if row is None or not self.is_active(row):
+            return None
+        return self.item_at(row)
+
+    def items(self) -> Iterator[ItemModel]:
+        """
+        every active item
+        """
+        for row in range(len(self)):
+            if self.is_active(row):
+                yield self.item_at(row)
+
+    def postings(self) -> Postings:
+        """
+        search postings of the active items, read from the buffer
+        """
+        columns = self.columns
+        return Postings(
+            self.item_ids,
+            columns['item.Grams'],
+            Strings(self, columns['search.grams']),
+            columns['search.offsets'],
+            columns['search.rows'],
+            Strings(self, columns['search.codes']),
+            columns['search.code_rows'],
+        )
+
+    def get_grosirs(self, item_id: int) -> List[ItemHargaGrosirModel]:
+        start = bisect_left(self.grosir_item_ids, item_id)
+        end = bisect_right(self.grosir_item_ids, item_id, start)
+        columns = self.columns
+        return [
+            ItemHargaGrosirModel.construct(
+                IDItemHargaGrosir=columns['grosir.IDItemHargaGrosir'][row],
+                IDItem=item_id,
+                Jumlah=columns['grosir.Jumlah'][row],
+                Harga=columns['grosir.Harga'][row],
+                IsDos=YaTidakEnum.ya if columns['grosir.IsDos'][row] else YaTidakEnum.tidak,
+            )
+            for row in range(start, end)
+        ]
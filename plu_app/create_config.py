@@ -41,6 +41,11 @@ def create_config():
 
     settings.app_title = Prompt.ask('nama perusahaan', console=console, default=settings.app_title)
     settings.app_subtitle = Prompt.ask('baris 2', console=console, default=settings.app_subtitle)
+    settings.replica_path = Prompt.ask(
+        'file replika SQLite lokal, kosong = langsung ke MySQL',
+        console=console,
+        default=settings.replica_path or '',
+    ) or None
 
     console.print('Create settings and save to: {}'.format(settings.Config.env_file))
     settings.save()
@@ -1,20 +1,137 @@
-from typing import Generator
-from sqlalchemy import create_engine
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from threading import Lock
+from typing import AsyncGenerator, Dict, Any
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .instrumentation import instrument_engine, record_pool_wait
 from .settings import get_settings
 
 
-engine = create_engine(
-    get_settings().get_db_url(),
-)
+class PoolMetrics:
+    """
+    Counters of the connection pool, to size it for burst traffic
+    """
 
-Session = sessionmaker(engine)
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
 
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
 
-async def get_session():
-    session = Session()
-    try:
+    def on_connect(self, *args) -> None:
+        self.connects += 1
+
+    def on_checkout(self, *args) -> None:
+        self.checkouts += 1
+
+    def on_checkin(self, *args) -> None:
+        self.checkins += 1
+
+    def on_invalidate(self, *args) -> None:
+        self.invalidations += 1
+
+    def as_dict(self, pool: AsyncAdaptedQueuePool) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'wait_count': self.waits,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that measures how long a checkout waits for a connection,
+    including opening a new one
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            pool_metrics.record_wait(waited)
+            record_pool_wait(waited)
+
+
+@lru_cache()
+def get_engine() -> AsyncEngine:
+    """
+    Engine is created on first use, so importing the app does not need
+    to decrypt the database password
+    """
+    settings = get_settings()
+    engine = create_async_engine(
+        settings.get_replica_url() if settings.replica_path else settings.get_async_db_url(),
+        poolclass=MeteredQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_pool_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    pool = engine.sync_engine.pool
+    event.listen(pool, 'connect', pool_metrics.on_connect)
+    event.listen(pool, 'checkout', pool_metrics.on_checkout)
+    event.listen(pool, 'checkin', pool_metrics.on_checkin)
+    event.listen(pool, 'invalidate', pool_metrics.on_invalidate)
+    instrument_engine(engine.sync_engine)
+    if settings.replica_path:
+        from .replica import configure_replica_engine
+        configure_replica_engine(engine.sync_engine, read_only=True)
+    return engine
+
+
+@lru_cache()
+def get_sessionmaker() -> sessionmaker:
+    return sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    return pool_metrics.as_dict(get_engine().sync_engine.pool)
+
+
+async def warm_pool() -> None:
+    """
+    Open ``db_pool_size`` connections at once, so the first requests do not
+    pay for connecting
+    """
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(*(
+            stack.enter_async_context(get_engine().connect())
+            for _ in range(get_settings().db_pool_size)
+        ))
+        for connection in connections:
+            await connection.execute(text('SELECT 1'))
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with get_sessionmaker()() as session:
         yield session
-    finally:
-        session.close()
-        
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+JSON encoding of PLUs without going through pydantic.
+
+PluModel.json() walks every field through pydantic's encoder, which is a
+large share of a cached lookup.  The models here are already valid, so
+their fields are dumped directly, with ``orjson`` when it is installed.
+"""
+import json
+from datetime import date
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # opsional, pip install orjson
+    orjson = None
+
+from .models import PluModel
+
+
+def plu_dict(plu: PluModel) -> Dict[str, Any]:
+    return {
+        'item': plu.item.__dict__,
+        'hargaGrosir': [grosir.__dict__ for grosir in plu.hargaGrosir],
+        'hargaPromo': [promo.__dict__ for promo in plu.hargaPromo],
+        'hargaEfektif': plu.hargaEfektif,
+    }
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+def encode_plu(plu: PluModel) -> bytes:
+    """
+    same JSON as ``plu.json()``, without whitespace
+    """
+    if orjson is not None:
+        return orjson.dumps(plu_dict(plu))
+    return json.dumps(
+        plu_dict(plu),
+        default=json_default,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
@@ -0,0 +1,180 @@
+"""
+Streaming export of the price book and the feed of price changes.
+
+Items are read through a server-side cursor and priced chunk by chunk on a
+second connection, so memory use does not grow with the catalog size.
+"""
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import Optional, List, Dict, Set, AsyncIterator, Iterable
+
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db import get_sessionmaker
+from .lookup import load_grosirs, load_promos
+from .models import ItemModel, PluModel, PluChangesModel
+from .price_cache import chunked, max_timestamp, get_price_cache
+from .schema import Item, ItemHarga, ItemHargaD
+
+
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_COLUMNS = list(ItemModel.__fields__) + ['HargaGrosir', 'HargaPromo']
+
+
+async def iter_plus(statement, today: Optional[date] = None) -> AsyncIterator[List[PluModel]]:
+    """
+    Price the items selected by ``statement`` at ``today``, yields a list
+    per chunk.  Prices of items in the price cache are taken from it.
+    """
+    if today is None:
+        today = date.today()
+
+    cache = get_price_cache()
+    Session = get_sessionmaker()
+    async with Session() as stream_session, Session() as session:
+        result = await stream_session.stream_scalars(
+            statement.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        async for items in result.partitions(EXPORT_CHUNK_SIZE):
+            cached = {item.IDItem: cache.get_plu(item.IDItem, today) for item in items}
+            item_ids = [item_id for item_id, plu in cached.items() if plu is None]
+            grosirs = await load_grosirs(session, item_ids)
+            promos = await load_promos(session, item_ids, today)
+            yield [
+                cached[item.IDItem] or PluModel(
+                    item=ItemModel.from_orm(item),
+                    hargaGrosir=grosirs[item.IDItem],
+                    hargaPromo=promos[item.IDItem],
+                )
+                for item in items
+            ]
+
+
+def pricebook_select():
+    return select(Item).where(
+        Item.Aktif == 'Ya'
+    ).order_by(
+        Item.IDItem
+    )
+
+
+def ndjson_chunk(plus: Iterable[PluModel]) -> str:
+    return ''.join(plu.json() + '\n' for plu in plus)
+
+
+def csv_header() -> str:
+    out = io.StringIO()
+    csv.writer(out).writerow(CSV_COLUMNS)
+    return out.getvalue()
+
+
+def csv_chunk(plus: Iterable[PluModel]) -> str:
+    """
+    one row per item, grosir tiers as ``jumlah@harga`` and promos as
+    ``kode@harga`` separated by ``|``
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for plu in plus:
+        writer.writerow(
+            [getattr(plu.item, column) for column in ItemModel.__fields__]
+            + [
+                '|'.join('{:g}@{:g}'.format(row.Jumlah, row.Harga) for row in plu.hargaGrosir),
+                '|'.join('{}@{:g}'.format(row.Kode, row.HargaJual) for row in plu.hargaPromo),
+            ]
+        )
+    return out.getvalue()
+
+
+async def stream_export(statement, export_format: str, today: Optional[date] = None) -> AsyncIterator[str]:
+    if export_format == 'csv':
+        yield csv_header()
+        async for plus in iter_plus(statement, today):
+            yield csv_chunk(plus)
+    else:
+        async for plus in iter_plus(statement, today):
+            yield ndjson_chunk(plus)
+
+
+async def load_changes(session: AsyncSession, since: datetime, today: Optional[date] = None) -> PluChangesModel:
+    """
+    Items whose price, grosir tiers or promo membership changed at or
+    after ``since``.  Grosir rows have no timestamp, their changes are
+    seen through the UpdateTime of the item.  Promos starting or ending
+    between ``since`` and today count as changes of their items.
+    """
+    if today is None:
+        today = date.today()
+    if since.tzinfo is not None:
+        # timestamp di database tanpa zona waktu, dalam waktu lokal
+        since = since.astimezone().replace(tzinfo=None)
+
+    # hari pertama yang pergantian tanggalnya belum pernah dikirim
+    first_day = since.date() + timedelta(days=1)
+    watermark = max(since, datetime.combine(today, time.min))
+
+    changed: Dict[int, Item] = {}
+    for item in (await session.execute(
+        select(Item).where(
+            or_(
+                Item.UpdateTime >= since,
+                Item.InsertTime >= since,
+            )
+        )
+    )).scalars():
+        watermark = max_timestamp(watermark, item.UpdateTime, item.InsertTime)
+        changed[item.IDItem] = item
+
+    promo_item_ids: Set[int] = set()
+    for row in (await session.execute(
+        select(
+            ItemHargaD.IDItem,
+            ItemHarga.UpdateTime,
+            ItemHarga.InsertTime,
+        ).join_from(
+            ItemHarga,
+            ItemHargaD,
+            ItemHarga.IDItemHargaH == ItemHargaD.IDItemHargaH,
+        ).where(
+            or_(
+                ItemHarga.UpdateTime >= since,
+                ItemHarga.InsertTime >= since,
+                and_(
+                    ItemHarga.TanggalAwal >= first_day,
+                    ItemHarga.TanggalAwal <= today,
+                ),
+                and_(
+                    ItemHarga.TanggalAkhir >= first_day - timedelta(days=1),
+                    ItemHarga.TanggalAkhir < today,
+                ),
+            )
+        )
+    )):
+        watermark = max_timestamp(watermark, row.UpdateTime, row.InsertTime)
+        promo_item_ids.add(row.IDItem)
+
+    for chunk in chunked(promo_item_ids - set(changed)):
+        for item in (await session.execute(
+            select(Item).where(Item.IDItem.in_(chunk))
+        )).scalars():
+            changed[item.IDItem] = item
+
+    active_ids = [item_id for item_id, item in changed.items() if item.Aktif != 'Tidak']
+    grosirs = await load_grosirs(session, active_ids)
+    promos = await load_promos(session, active_ids, today)
+
+    return PluChangesModel(
+        watermark=watermark,
+        items=[
+            PluModel(
+                item=ItemModel.from_orm(changed[item_id]),
+                hargaGrosir=grosirs[item_id],
+                hargaPromo=promos[item_id],
+            )
+            for item_id in sorted(active_ids)
+        ],
+        removed=sorted(item_id for item_id, item in changed.items() if item.Aktif == 'Tidak'),
+    )
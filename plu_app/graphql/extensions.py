@@ -0,0 +1,74 @@
+import inspect
+from time import monotonic, perf_counter
+from typing import Any, Dict, Optional, Tuple
+from strawberry.extensions import FieldExtension, SchemaExtension
+from strawberry.types import Info
+
+from ..instrumentation import resolver_histograms
+
+
+class StaticResultCache(FieldExtension):
+    """
+    Caches the result of a field whose data does not depend on the
+    request, keyed by the field arguments.  ``ttl`` in seconds, None
+    keeps the result for the lifetime of the process.
+    """
+
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        self.ttl = ttl
+        self._results: Dict[Tuple, Tuple[float, Any]] = {}
+
+    def _get(self, key: Tuple) -> Tuple[bool, Any]:
+        cached = self._results.get(key)
+        if cached is None:
+            return False, None
+        stored_at, result = cached
+        if self.ttl is not None and monotonic() - stored_at >= self.ttl:
+            return False, None
+        return True, result
+
+    def _put(self, key: Tuple, result: Any) -> Any:
+        self._results[key] = (monotonic(), result)
+        return result
+
+    def resolve(self, next_, source: Any, info: Info, **kwargs: Any) -> Any:
+        key = tuple(sorted(kwargs.items()))
+        found, result = self._get(key)
+        if found:
+            return result
+        return self._put(key, next_(source, info, **kwargs))
+
+    async def resolve_async(self, next_, source: Any, info: Info, **kwargs: Any) -> Any:
+        key = tuple(sorted(kwargs.items()))
+        found, result = self._get(key)
+        if found:
+            return result
+        return self._put(key, await next_(source, info, **kwargs))
+
+
+class ResolverTiming(SchemaExtension):
+    """
+    Times root fields and async resolvers, the ones that reach the
+    database or the cache; plain attribute fields are not recorded and
+    stay synchronous
+    """
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        started = perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        if inspect.isawaitable(result):
+            return self._timed(result, info, started)
+        if info.path.prev is None:
+            self._observe(info, started)
+        return result
+
+    async def _timed(self, result, info, started: float):
+        result = await result
+        self._observe(info, started)
+        return result
+
+    def _observe(self, info, started: float) -> None:
+        resolver_histograms.observe(
+            '{}.{}'.format(info.parent_type.name, info.field_name),
+            (perf_counter() - started) * 1000,
+        )
@@ -0,0 +1,40 @@
+"""
+DataLoaders batching the price queries of every item in one GraphQL request
+"""
+import asyncio
+from datetime import date
+from typing import List, Dict, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from strawberry.dataloader import DataLoader
+
+from ..lookup import load_grosirs, load_promos
+from ..models import ItemHargaGrosirModel, ItemHargaPromoModel
+
+
+def create_loaders(session: AsyncSession, session_lock: asyncio.Lock) -> Dict[str, DataLoader]:
+    """
+    Loaders are created per request, they share the request's session
+    """
+
+    async def load_bulk_prices(item_ids: List[int]) -> List[List[ItemHargaGrosirModel]]:
+        async with session_lock:
+            grouped = await load_grosirs(session, item_ids)
+        return [grouped[item_id] for item_id in item_ids]
+
+    async def load_promo_prices(keys: List[Tuple[int, date]]) -> List[List[ItemHargaPromoModel]]:
+        # key berupa (IDItem, tanggal harga)
+        item_ids: Dict[date, List[int]] = {}
+        for item_id, day in keys:
+            item_ids.setdefault(day, []).append(item_id)
+
+        grouped: Dict[date, Dict[int, List[ItemHargaPromoModel]]] = {}
+        async with session_lock:
+            for day, ids in item_ids.items():
+                grouped[day] = await load_promos(session, ids, day)
+        return [grouped[day][item_id] for item_id, day in keys]
+
+    return {
+        'bulk_prices_loader': DataLoader(load_fn=load_bulk_prices),
+        'promo_prices_loader': DataLoader(load_fn=load_promo_prices),
+    }
@@ -3,14 +3,26 @@ from datetime import date
 from typing import Optional, List
 import strawberry
 from strawberry.types import Info
-from sqlalchemy import select, desc, and_, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from sqlalchemy.exc import OperationalError
 
 # from ..db import Session
-from ..schema import Item, ItemHarga, ItemHargaD, ItemHargaGrosir
+from ..lookup import ItemNotFoundError, lookup_plu, lookup_plu_batch, search_plu
+from ..models import ItemHargaGrosirModel, ItemHargaPromoModel, PluModel, effective_price
+from ..price_cache import get_price_cache
+from ..schema import Item
+from ..metadata import get_metadata
 from ..settings import get_settings
-from ..version import get_version
+from .extensions import ResolverTiming, StaticResultCache
+
+
+async def execute(info: Info, statement):
+    """
+    AsyncSession does not allow concurrent operations, sibling resolvers
+    take turns on the session of the request
+    """
+    async with info.context['session_lock']:
+        return await info.context['session'].execute(statement)
 
 
 @strawberry.type(description='Bulk Price is the unit price on item with quantity')
@@ -40,72 +52,85 @@ class ItemType:
     name: str
     normal_price: float
     discounted_price: float
+    # diisi jika harga sudah didapat bersama item, misalnya dari price cache
+    prefetched_bulk_prices: strawberry.Private[Optional[List[BulkPrice]]] = None
+    prefetched_promo_prices: strawberry.Private[Optional[List[PromoPrice]]] = None
+    prefetched_effective_price: strawberry.Private[Optional[float]] = None
+    # tanggal harga, None berarti hari ini
+    at: strawberry.Private[Optional[date]] = None
 
     @strawberry.field
-    def bulk_prices(self, info: Info) -> List[BulkPrice]:
-        item_id = int(self.id)
-        session: Session = info.context['session']
-        rows: List[ItemHargaGrosir] = session.execute(
-            select(ItemHargaGrosir).where(
-                and_(
-                    ItemHargaGrosir.IDItem == item_id,
-                    ItemHargaGrosir.Aktif == 'Ya',
-                )
-            ).order_by(
-                ItemHargaGrosir.Jumlah
-            )
-        ).scalars().all()
+    async def bulk_prices(self, info: Info) -> List[BulkPrice]:
+        if self.prefetched_bulk_prices is not None:
+            return self.prefetched_bulk_prices
 
-        return [
-            BulkPrice(
-                id=strawberry.ID(str(row.IDItemHargaGrosir)),
-                quantity=int(row.Jumlah),
-                unit_price=row.Harga,
-            )
-            for row in rows
-        ]
+        rows = await info.context['bulk_prices_loader'].load(int(self.id))
+        return [bulk_price_from_model(row) for row in rows]
 
     @strawberry.field
-    def promo_prices(self, info: Info) -> List[PromoPrice]:
-        item_id = int(self.id)
-        session: Session = info.context['session']
-        rows = session.execute(
-            select(
-                ItemHargaD.IDItemHargaD,
-                ItemHarga.Kode,
-                ItemHarga.Nama,
-                ItemHarga.TanggalAwal,
-                ItemHarga.TanggalAkhir,
-                ItemHargaD.DiskonPersen,
-                ItemHargaD.Diskon,
-                ItemHargaD.HargaJual,
-            ).join_from(
-                ItemHarga,
-                ItemHargaD,
-                ItemHarga.IDItemHargaH == ItemHargaD.IDItemHargaH,
-            ).where(
-                and_(
-                    ItemHargaD.IDItem == item_id,
-                    ItemHarga.Aktif == 'Ya',
-                    ItemHarga.TanggalAwal <= date.today(),
-                    ItemHarga.TanggalAkhir >= date.today(),
-                )
-            )
-        ).all()
+    async def promo_prices(self, info: Info) -> List[PromoPrice]:
+        if self.prefetched_promo_prices is not None:
+            return self.prefetched_promo_prices
 
-        return [
-            PromoPrice(
-                id=strawberry.ID(str(row.IDItemHargaD)),
-                promo_code=row.Kode,
-                promo_name=row.Nama,
-                start=row.TanggalAwal,
-                end=row.TanggalAkhir,
-                discount_percent=row.DiskonPersen,
-                discount=row.Diskon,
-                unit_price=row.HargaJual,
-            )
-            for row in rows
-        ]
+        rows = await info.context['promo_prices_loader'].load(
+            (int(self.id), self.at or date.today())
+        )
+        return [promo_price_from_model(row) for row in rows]
+
+    @strawberry.field(description='lowest unit price with the promos in effect')
+    async def effective_price(self, info: Info) -> float:
+        if self.prefetched_effective_price is not None:
+            return self.prefetched_effective_price
+
+        promo_prices = await self.promo_prices(info)
+        return effective_price(
+            self.discounted_price,
+            self.normal_price,
+            ((promo.unit_price, promo.discount, promo.discount_percent) for promo in promo_prices),
+        )
+
+
+def bulk_price_from_model(row: ItemHargaGrosirModel) -> BulkPrice:
+    return BulkPrice(
+        id=strawberry.ID(str(row.IDItemHargaGrosir)),
+        quantity=int(row.Jumlah),
+        unit_price=row.Harga,
+    )
+
+
+def promo_price_from_model(row: ItemHargaPromoModel) -> PromoPrice:
+    return PromoPrice(
+        id=strawberry.ID(str(row.IDItemHargaD)),
+        promo_code=row.Kode,
+        promo_name=row.Nama,
+        start=row.TanggalAwal,
+        end=row.TanggalAkhir,
+        discount_percent=row.DiskonPersen,
+        discount=row.Diskon,
+        unit_price=row.HargaJual,
+    )
+
+
+def item_type_from_plu(plu: PluModel, at: Optional[date] = None) -> ItemType:
+    return ItemType(
+        id=strawberry.ID(str(plu.item.IDItem)),
+        code=plu.item.Kode,
+        barcode=plu.item.Barcode,
+        name=plu.item.Nama,
+        normal_price=plu.item.HargaNormal,
+        discounted_price=plu.item.HargaJual,
+        prefetched_bulk_prices=[bulk_price_from_model(row) for row in plu.hargaGrosir],
+        prefetched_promo_prices=[promo_price_from_model(row) for row in plu.hargaPromo],
+        prefetched_effective_price=plu.hargaEfektif,
+        at=at,
+    )
+
+
+@strawberry.type(description='Result of looking up one barcode in a batch')
+class PluResult:
+    barcode: str
+    item: Optional[ItemType]
+    error: Optional[str]
 
 
 @strawberry.type(description='Provide global values')
@@ -118,21 +143,13 @@ class Globals:
 @strawberry.type
 class Query():
     @strawberry.field(description='to look up for item price using barcode')
-    def plu(self, barcode: str, info: Info) -> ItemType:
-        session: Session = info.context['session']
-
+    async def plu(self, barcode: str, info: Info, at: Optional[date] = None) -> ItemType:
         try:
-            item: Optional[Item] = session.execute(
-                select(Item).where(
-                    or_(
-                        Item.Kode == barcode,
-                        Item.Barcode == barcode,
-                    ),
-                ).order_by(
-                    # diprioritaskan yang barcode-nya sama
-                    desc(Item.Barcode == barcode)
-                ).limit(1)
-            ).scalar_one_or_none()
+            async with info.context['session_lock']:
+                plu = await lookup_plu(info.context['session'], barcode, at)
+
+        except ItemNotFoundError:
+            raise
 
         except OperationalError as err:
             logging.exception("Error query plu")
@@ -146,33 +163,63 @@ class Query():
                 "Error di server, mohon coba beberapa saat lagi"
             )
 
-        if item is None:
+        return item_type_from_plu(plu, at)
+
+    @strawberry.field(description='to look up for many item prices at once using barcodes')
+    async def plus(self, barcodes: List[str], info: Info, at: Optional[date] = None) -> List[PluResult]:
+        max_codes = get_settings().plu_batch_max_codes
+        if len(barcodes) > max_codes:
             raise ValueError(
-                "Barang dengan kode/barcode {!r} tidak ditemukan".format(barcode)
+                "Maksimal {} kode/barcode per permintaan".format(max_codes)
             )
 
-        if item.Aktif == 'Tidak':
+        try:
+            async with info.context['session_lock']:
+                items, errors = await lookup_plu_batch(info.context['session'], barcodes, at)
+
+        except Exception:
+            logging.exception("Error query plus")
             raise ValueError(
-                "Barang dengan kode/barcode {!r} tidak aktif".format(barcode)
+                "Error di server, mohon coba beberapa saat lagi"
             )
 
-        return ItemType(
-            id=strawberry.ID(str(item.IDItem)),
-            code=item.Kode,
-            barcode=item.Barcode,
-            name=item.Nama,
-            normal_price=item.HargaNormal,
-            discounted_price=item.HargaJual,
-        )
+        return [
+            PluResult(
+                barcode=barcode,
+                item=item_type_from_plu(items[barcode], at) if barcode in items else None,
+                error=errors.get(barcode),
+            )
+            for barcode in dict.fromkeys(barcodes)
+        ]
+
+    @strawberry.field(description='to search items by name or code, best match first')
+    async def search(self, query: str, info: Info, limit: int = 20) -> List[ItemType]:
+        if not query.strip():
+            return []
+        try:
+            async with info.context['session_lock']:
+                plus = await search_plu(info.context['session'], query, limit)
+
+        except Exception:
+            logging.exception("Error query search")
+            raise ValueError(
+                "Error di server, mohon coba beberapa saat lagi"
+            )
+
+        return [item_type_from_plu(plu) for plu in plus]
 
     @strawberry.field(description='to look up for item price using item id')
-    def item(self, id: strawberry.ID, info: Info) -> ItemType:
-        session: Session = info.context['session']
-        item: Optional[Item] = session.execute(
+    async def item(self, id: strawberry.ID, info: Info, at: Optional[date] = None) -> ItemType:
+        plu = get_price_cache().get_plu(int(id), at)
+        if plu is not None:
+            return item_type_from_plu(plu, at)
+
+        item: Optional[Item] = (await execute(
+            info,
             select(Item).where(
                 Item.IDItem == int(id),
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
 
         if item is None:
             raise ValueError(
@@ -191,14 +238,16 @@ class Query():
             name=item.Nama,
             normal_price=item.HargaNormal,
             discounted_price=item.HargaJual,
+            at=at,
         )
 
-    @strawberry.field(description='get globals var')
+    @strawberry.field(description='get globals var', extensions=[StaticResultCache()])
     def globals(self) -> Globals:
+        metadata = get_metadata()
         return Globals(
-            app_title=get_settings().app_title,
-            app_subtitle=get_settings().app_subtitle,
-            version=get_version(),
+            app_title=metadata.app_title,
+            app_subtitle=metadata.app_subtitle,
+            version=metadata.version,
         )
 
-schema = strawberry.Schema(query=Query)
+schema = strawberry.Schema(query=Query, extensions=[ResolverTiming])
@@ -0,0 +1,81 @@
+"""
+HTTP caching helpers: ETag revalidation for JSON responses and long lived
+cache headers for the hashed Vite assets
+"""
+import hashlib
+from typing import Optional, Mapping
+
+from fastapi import Request, Response, status
+from fastapi.staticfiles import StaticFiles
+from starlette.types import Scope
+
+
+# asset dari vite memakai hash di nama file, isinya tidak pernah berubah
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# boleh disimpan browser, tapi harus divalidasi ulang setiap dipakai
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+def strip_weak(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def content_etag(content: bytes) -> str:
+    return '"{}"'.format(hashlib.sha1(content).hexdigest())
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    True if the If-None-Match header of the request matches ``etag``
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # perbandingan weak, sesuai RFC 7232 untuk If-None-Match
+    candidates = {strip_weak(tag) for tag in if_none_match.split(',')}
+    return strip_weak(etag) in candidates
+
+
+def not_modified_response(etag: str, headers: Optional[Mapping[str, str]] = None) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={
+            **(headers or {}),
+            'ETag': etag,
+            'Cache-Control': REVALIDATE_CACHE_CONTROL,
+        },
+    )
+
+
+def json_response(request: Request, content: bytes) -> Response:
+    """
+    JSON response with a content ETag, answers 304 when the client
+    already has the same content
+    """
+    etag = content_etag(content)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return Response(
+        content=content,
+        media_type='application/json',
+        headers={
+            'ETag': etag,
+            'Cache-Control': REVALIDATE_CACHE_CONTROL,
+        },
+    )
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for content hashed file names, lets browsers keep them
+    without revalidating
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
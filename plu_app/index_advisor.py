@@ -0,0 +1,137 @@
+"""
+EXPLAIN the hot queries of the app against the configured database, flag
+full table scans and print the DDL of the missing indexes.
+
+Runs at the end of ``python -m plu_app.save_schema`` or on its own with
+``python -m plu_app.index_advisor``.
+"""
+from datetime import date, datetime
+from typing import List, Tuple
+
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.engine import Engine, Connection
+
+from .lookup import plu_select, items_by_codes_select, grosirs_select, promos_select
+from .price_cache import changed_items_select, changed_promos_select
+from .schema import Item
+from .settings import get_settings
+
+
+# (tabel, kolom, dipakai oleh)
+RECOMMENDED_INDEXES: List[Tuple[str, Tuple[str, ...], str]] = [
+    ('mitem', ('Barcode',), 'lookup by barcode'),
+    ('mitem', ('Kode',), 'lookup by kode'),
+    ('mitem', ('UpdateTime',), 'price cache and change feed polling'),
+    ('mitem', ('InsertTime',), 'price cache and change feed polling'),
+    ('mitem', ('IDItemTree',), 'items of a category subtree'),
+    ('mitemhargagrosir', ('IDItem', 'Aktif'), 'grosir prices of an item'),
+    ('titemhargad', ('IDItem',), 'promo prices of an item'),
+    ('titemhargah', ('TanggalAwal', 'TanggalAkhir'), 'promo date range'),
+    ('titemhargah', ('UpdateTime',), 'price cache and change feed polling'),
+    ('titemhargah', ('InsertTime',), 'price cache and change feed polling'),
+]
+
+
+def index_name(table: str, columns: Tuple[str, ...]) -> str:
+    return 'Idx_{}_{}'.format(table, '_'.join(columns))
+
+
+def missing_indexes(engine: Engine) -> List[Tuple[str, Tuple[str, ...], str]]:
+    """
+    recommended indexes not covered by the leading columns of an existing
+    index or the primary key
+    """
+    insp = inspect(engine)
+    missing = []
+    for table, columns, reason in RECOMMENDED_INDEXES:
+        if not insp.has_table(table):
+            continue
+        existing = [tuple(index['column_names']) for index in insp.get_indexes(table)]
+        existing.append(tuple(insp.get_pk_constraint(table)['constrained_columns']))
+        if not any(index[:len(columns)] == columns for index in existing):
+            missing.append((table, columns, reason))
+    return missing
+
+
+def explain(connection: Connection, statement) -> List[dict]:
+    compiled = statement.compile(
+        dialect=connection.dialect,
+        compile_kwargs={'render_postcompile': True},
+    )
+    if compiled.positiontup is not None:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    result = connection.exec_driver_sql('EXPLAIN ' + compiled.string, params)
+    return [dict(row._mapping) for row in result]
+
+
+def hot_queries(connection: Connection) -> List[Tuple[str, object]]:
+    sample = connection.execute(
+        select(Item.IDItem, Item.Kode, Item.Barcode).where(Item.Barcode.isnot(None)).limit(1)
+    ).first()
+    code = sample.Barcode if sample is not None else '0000000000000'
+    item_id = sample.IDItem if sample is not None else 0
+    today = date.today()
+    watermark = datetime.now()
+    return [
+        ('lookup_plu', plu_select(code, today)),
+        ('lookup_plu_batch items', items_by_codes_select([code, code + '0'])),
+        ('grosir prices', grosirs_select([item_id])),
+        ('promo prices', promos_select([item_id], today)),
+        ('price cache items poll', changed_items_select(watermark)),
+        ('price cache promos poll', changed_promos_select(watermark)),
+    ]
+
+
+def advise(engine: Engine, console: Console) -> None:
+    table = Table(title='EXPLAIN hot queries')
+    for column in ['query', 'table', 'type', 'key', 'rows', 'extra']:
+        table.add_column(column)
+
+    full_scans = 0
+    with engine.connect() as connection:
+        for name, statement in hot_queries(connection):
+            for row in explain(connection, statement):
+                access = row.get('type')
+                style = None
+                if access == 'ALL':
+                    full_scans += 1
+                    style = 'red'
+                table.add_row(
+                    name,
+                    str(row.get('table')),
+                    str(access),
+                    str(row.get('key')),
+                    str(row.get('rows')),
+                    str(row.get('Extra') or ''),
+                    style=style,
+                )
+    console.print(table)
+
+    if full_scans:
+        console.print('[red]{} full table scan(s) found, marked red above[/red]'.format(full_scans))
+
+    missing = missing_indexes(engine)
+    if not missing:
+        console.print('[green]All recommended indexes are present[/green]')
+        return
+
+    console.print('Missing indexes, DDL to add them:')
+    for table_name, columns, reason in missing:
+        console.print('-- {}'.format(reason))
+        console.print('CREATE INDEX `{}` ON `{}` ({});'.format(
+            index_name(table_name, columns),
+            table_name,
+            ', '.join('`{}`'.format(column) for column in columns),
+        ), highlight=False)
+
+
+def main():
+    advise(create_engine(get_settings().get_db_url()), Console())
+
+
+if __name__ == '__main__':
+    main()
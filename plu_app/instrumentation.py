@@ -0,0 +1,157 @@
+"""
+Per-request query counting and timing.
+
+Engine events add query time to the timing of the current request, the
+ASGI middleware reports it in the Server-Timing header and keeps
+histograms per route; GraphQL resolvers get their own histograms.
+"""
+import bisect
+import time
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional, Dict, Any
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+
+# batas atas bucket histogram dalam milidetik
+BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class RequestTiming:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('current_timing', default=None)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+
+    def observe(self, ms: float, queries: int = 0, db_ms: float = 0.0) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.queries += queries
+        self.db_ms += db_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_ms': self.sum_ms,
+            'queries': self.queries,
+            'db_ms': self.db_ms,
+            'buckets': {
+                **{'le_{:g}'.format(bound): count for bound, count in zip(BUCKETS_MS, self.counts)},
+                'le_inf': self.counts[-1],
+            },
+        }
+
+
+class Histograms:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._histograms: Dict[str, Histogram] = {}
+
+    def observe(self, key: str, ms: float, queries: int = 0, db_ms: float = 0.0) -> None:
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(ms, queries, db_ms)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: histogram.as_dict() for key, histogram in sorted(self._histograms.items())}
+
+
+route_histograms = Histograms()
+resolver_histograms = Histograms()
+
+
+def record_pool_wait(seconds: float) -> None:
+    timing = current_timing.get()
+    if timing is not None:
+        timing.pool_wait_seconds += seconds
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info['query_started'].pop()
+    timing = current_timing.get()
+    if timing is not None:
+        timing.queries += 1
+        timing.db_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine) -> None:
+    """
+    ``engine`` is a sqlalchemy Engine, sqlalchemy is imported with the
+    database code rather than with the middleware
+    """
+    from sqlalchemy import event
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def get_metrics() -> Dict[str, Any]:
+    return {
+        'routes': route_histograms.as_dict(),
+        'graphql': resolver_histograms.as_dict(),
+    }
+
+
+class ServerTimingMiddleware:
+    """
+    Adds ``Server-Timing: db;dur=..;desc="N queries", pool;dur=.., app;dur=..``
+    to every HTTP response and records the request in the route histograms
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def route_key(self, scope: Scope) -> str:
+        for route in scope['app'].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return '{} {}'.format(scope['method'], route.path)
+        return '{} (unmatched)'.format(scope['method'])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+
+        async def send_with_timing(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                app_ms = (time.perf_counter() - timing.started) * 1000
+                db_ms = timing.db_seconds * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing', 'db;dur={:.2f};desc="{} queries", pool;dur={:.2f}, app;dur={:.2f}'.format(
+                    db_ms, timing.queries, timing.pool_wait_seconds * 1000, app_ms,
+                ))
+                route_histograms.observe(self.route_key(scope), app_ms, timing.queries, db_ms)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
@@ -0,0 +1,79 @@
+"""
+Category tree (``mitemtree``) subtree lookups.
+
+``TreePath`` is a materialized path, the subtree of a category is every
+category whose TreePath starts with its own.  The categories are kept sorted
+by TreePath in memory, so a subtree is one contiguous slice found by
+bisection instead of a recursive or ``LIKE 'path%'`` query.
+"""
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, List, Dict
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ItemTreeModel
+from .schema import Item, ItemTree
+from .settings import get_settings
+
+
+class TreeIndex:
+    """
+    Categories sorted by TreePath, reloaded when older than
+    item_tree_cache_seconds
+    """
+
+    def __init__(self) -> None:
+        self.trees: List[ItemTreeModel] = []
+        self.paths: List[str] = []
+        self.by_kode: Dict[str, ItemTreeModel] = {}
+        self.loaded_at: Optional[datetime] = None
+
+    async def refresh(self, session: AsyncSession) -> None:
+        max_age = timedelta(seconds=get_settings().item_tree_cache_seconds)
+        if self.loaded_at is not None and datetime.now() - self.loaded_at < max_age:
+            return
+
+        rows = (await session.execute(select(ItemTree))).scalars()
+        trees = sorted((ItemTreeModel.from_orm(row) for row in rows), key=lambda tree: tree.TreePath)
+        self.trees = trees
+        self.paths = [tree.TreePath for tree in trees]
+        self.by_kode = {tree.Kode: tree for tree in trees}
+        self.loaded_at = datetime.now()
+
+    def get(self, kode: str) -> Optional[ItemTreeModel]:
+        return self.by_kode.get(kode)
+
+    def subtree(self, root: ItemTreeModel) -> List[ItemTreeModel]:
+        """
+        ``root`` and its descendants in TreePath order
+        """
+        start = bisect_left(self.paths, root.TreePath)
+        # karakter unicode terbesar, batas atas semua path berawalan root
+        end = bisect_left(self.paths, root.TreePath + '\U0010ffff', start)
+        return self.trees[start:end]
+
+
+@lru_cache()
+def get_tree_index() -> TreeIndex:
+    return TreeIndex()
+
+
+def subtree_items_select(trees: List[ItemTreeModel]):
+    """
+    active items of the categories, by category then Kode
+    """
+    return select(Item).join(
+        ItemTree,
+        ItemTree.IDItemTree == Item.IDItemTree,
+    ).where(
+        and_(
+            Item.Aktif == 'Ya',
+            Item.IDItemTree.in_([tree.IDItemTree for tree in trees]),
+        )
+    ).order_by(
+        ItemTree.TreePath,
+        Item.Kode,
+    )
@@ -0,0 +1,75 @@
+"""
+Routers imported on first use.
+
+Importing every router (and with it the GraphQL schema, the ORM mapping and
+the price cache) is most of the time it takes to import ``plu_app.main``.
+A LazyRoutes placeholder stands in for the routes under a path prefix and
+includes the real router in its place when the first request arrives.
+"""
+import importlib
+from fastapi import FastAPI
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from starlette.types import Scope, Receive, Send
+
+from .startup import startup_profile
+
+
+class LazyRoutes(BaseRoute):
+    """
+    Placeholder for ``router`` of ``module``, included with ``prefix``
+    """
+
+    def __init__(self, path: str, module: str, prefix: str = '') -> None:
+        self.path = path
+        self.module = module
+        self.prefix = prefix
+        self.loaded = False
+
+    def matches(self, scope: Scope):
+        if scope['type'] in ('http', 'websocket') and (
+            scope['path'] == self.path or scope['path'].startswith(self.path + '/')
+        ):
+            return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    def load(self, app: FastAPI) -> None:
+        """
+        Replace the placeholder with the routes of the router
+        """
+        if self.loaded:
+            return
+        with startup_profile.step('load ' + self.module):
+            router = importlib.import_module(self.module).router
+            routes = app.router.routes
+            count = len(routes)
+            app.include_router(router, prefix=self.prefix)
+            included = routes[count:]
+            del routes[count:]
+            index = routes.index(self)
+            routes[index:index + 1] = included
+        self.loaded = True
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        app: FastAPI = scope['app']
+        self.load(app)
+        # dicocokkan ulang dengan route yang sebenarnya
+        await app.router(scope, receive, send)
+
+
+def add_lazy_routes(app: FastAPI, path: str, module: str, prefix: str = '') -> LazyRoutes:
+    """
+    Add a placeholder for the routes of ``module`` under ``path``, the
+    router is included with ``prefix`` (default none, the router has its own)
+    """
+    route = LazyRoutes(path, module, prefix)
+    app.router.routes.append(route)
+    return route
+
+
+def load_lazy_routes(app: FastAPI) -> None:
+    for route in list(app.router.routes):
+        if isinstance(route, LazyRoutes):
+            route.load(app)
@@ -0,0 +1,364 @@
+"""
+Item lookup by Kode/Barcode shared by the REST and GraphQL routers.
+
+Item, active grosir tiers and promos active today are fetched in one
+statement, the grosir x promo combinations are folded back in python.
+Batch lookups use one IN (...) query per table instead.  Searches are
+answered by the price cache, or by LIKE queries while it is not loaded.
+"""
+from datetime import date
+from typing import Optional, Dict, List, Iterable, Tuple
+
+from sqlalchemy import select, and_, or_, case, func, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .barcode import barcode_variants, normalize_barcode
+from .encoding import encode_plu
+from .models import ItemModel, ItemHargaGrosirModel, ItemHargaPromoModel, PluModel
+from .price_cache import get_price_cache, chunked
+from .schema import Item, ItemHarga, ItemHargaD, ItemHargaGrosir
+from .search_index import words
+from .settings import get_settings
+
+
+class ItemNotFoundError(ValueError):
+    """
+    Item is not found or inactive, the message is shown to the user
+    """
+
+
+def not_found_message(code: str) -> str:
+    return "Barang dengan kode/barcode {!r} tidak ditemukan".format(code)
+
+
+def inactive_message(code: str) -> str:
+    return "Barang dengan kode/barcode {!r} tidak aktif".format(code)
+
+
+def collation_key(code: str) -> str:
+    """
+    MySQL compares Kode/Barcode case insensitive and ignoring trailing
+    spaces, matched rows are paired back to the requested code with this
+    """
+    return code.rstrip().casefold()
+
+
+def item_id_select(code: str):
+    """
+    IDItem of the item with Barcode ``code``, or else with an equivalent
+    EAN/UPC form of it, or else with Kode ``code``.  Each probe is an
+    equality on its own index; an OR of both columns with an order on the
+    comparison would scan mitem instead.
+    """
+    # diprioritaskan yang barcode-nya sama
+    conditions = [Item.Barcode == code]
+    variants = [variant for variant in barcode_variants(code) if variant != code]
+    if variants:
+        conditions.append(Item.Barcode.in_(variants))
+    conditions.append(Item.Kode == code)
+
+    probes = []
+    for priority, condition in enumerate(conditions):
+        probe = select(
+            Item.IDItem, literal(priority).label('priority')
+        ).where(
+            condition
+        ).limit(1).subquery('probe_{}'.format(priority))
+        probes.append(select(probe.c.IDItem, probe.c.priority))
+
+    probe = union_all(*probes).subquery('probe')
+    return select(probe.c.IDItem).order_by(probe.c.priority).limit(1)
+
+
+def plu_select(code: str, today: date):
+    item_id = item_id_select(code).scalar_subquery()
+
+    promo = ItemHargaD.__table__.join(
+        ItemHarga.__table__,
+        and_(
+            ItemHarga.IDItemHargaH == ItemHargaD.IDItemHargaH,
+            ItemHarga.Aktif == 'Ya',
+            ItemHarga.TanggalAwal <= today,
+            ItemHarga.TanggalAkhir >= today,
+        )
+    )
+
+    return select(
+        Item,
+        ItemHargaGrosir,
+        ItemHargaD.IDItemHargaD,
+        ItemHargaD.IDItemHargaH,
+        ItemHargaD.IDItem,
+        ItemHarga.Kode,
+        ItemHarga.Nama,
+        ItemHarga.TanggalAwal,
+        ItemHarga.TanggalAkhir,
+        ItemHarga.Keterangan,
+        ItemHargaD.HargaJual,
+        ItemHargaD.DiskonPersen,
+        ItemHargaD.Diskon,
+    ).outerjoin(
+        ItemHargaGrosir,
+        and_(
+            ItemHargaGrosir.IDItem == Item.IDItem,
+            ItemHargaGrosir.Aktif == 'Ya',
+        )
+    ).outerjoin(
+        promo,
+        ItemHargaD.IDItem == Item.IDItem,
+    ).where(
+        Item.IDItem == item_id
+    ).order_by(
+        ItemHargaGrosir.Jumlah,
+        ItemHarga.Kode,
+    )
+
+
+async def lookup_plu(session: AsyncSession, code: str, today: Optional[date] = None) -> PluModel:
+    """
+    Get Item by Kode/Barcode with its grosir and promo prices, from the
+    price cache if possible
+    """
+    plu = get_price_cache().lookup(code, today)
+    if plu is not None:
+        return plu
+
+    if today is None:
+        today = date.today()
+
+    rows = (await session.execute(plu_select(code, today))).all()
+    if not rows:
+        raise ItemNotFoundError(not_found_message(code))
+
+    item: Item = rows[0][0]
+    if item.Aktif == 'Tidak':
+        raise ItemNotFoundError(inactive_message(code))
+
+    grosirs: Dict[int, ItemHargaGrosirModel] = {}
+    promos: Dict[int, ItemHargaPromoModel] = {}
+    for row in rows:
+        grosir: Optional[ItemHargaGrosir] = row[1]
+        if grosir is not None and grosir.IDItemHargaGrosir not in grosirs:
+            grosirs[grosir.IDItemHargaGrosir] = ItemHargaGrosirModel.from_orm(grosir)
+        if row.IDItemHargaD is not None and row.IDItemHargaD not in promos:
+            promos[row.IDItemHargaD] = ItemHargaPromoModel.from_orm(row)
+
+    return PluModel(
+        item=ItemModel.from_orm(item),
+        hargaGrosir=list(grosirs.values()),
+        hargaPromo=list(promos.values()),
+    )
+
+
+async def lookup_plu_json(session: AsyncSession, code: str, today: Optional[date] = None) -> bytes:
+    """
+    ``lookup_plu`` encoded as JSON, ready made by the price cache if
+    possible
+    """
+    content = get_price_cache().lookup_json(code, today)
+    if content is not None:
+        return content
+    return encode_plu(await lookup_plu(session, code, today))
+
+
+def grosirs_select(item_ids: List[int]):
+    return select(ItemHargaGrosir).where(
+        and_(
+            ItemHargaGrosir.IDItem.in_(item_ids),
+            ItemHargaGrosir.Aktif == 'Ya',
+        )
+    ).order_by(
+        ItemHargaGrosir.IDItem,
+        ItemHargaGrosir.Jumlah,
+    )
+
+
+def promos_select(item_ids: List[int], today: date):
+    return select(
+        ItemHargaD.IDItemHargaD,
+        ItemHargaD.IDItemHargaH,
+        ItemHargaD.IDItem,
+        ItemHarga.Kode,
+        ItemHarga.Nama,
+        ItemHarga.TanggalAwal,
+        ItemHarga.TanggalAkhir,
+        ItemHarga.Keterangan,
+        ItemHargaD.HargaJual,
+        ItemHargaD.DiskonPersen,
+        ItemHargaD.Diskon,
+    ).join_from(
+        ItemHarga,
+        ItemHargaD,
+        ItemHarga.IDItemHargaH == ItemHargaD.IDItemHargaH,
+    ).where(
+        and_(
+            ItemHargaD.IDItem.in_(item_ids),
+            ItemHarga.Aktif == 'Ya',
+            ItemHarga.TanggalAwal <= today,
+            ItemHarga.TanggalAkhir >= today,
+        )
+    ).order_by(
+        ItemHarga.Kode
+    )
+
+
+def items_by_codes_select(codes: List[str]):
+    """
+    items matching ``codes`` by Barcode (in any EAN/UPC form) or by Kode,
+    one index probe per column, an item matching both comes twice
+    """
+    barcodes = dict.fromkeys(codes)
+    for code in codes:
+        barcodes.update(dict.fromkeys(barcode_variants(code)))
+
+    return select(Item).from_statement(
+        union_all(
+            select(Item).where(Item.Barcode.in_(list(barcodes))),
+            select(Item).where(Item.Kode.in_(codes)),
+        )
+    )
+
+
+async def load_grosirs(session: AsyncSession, item_ids: Iterable[int]) -> Dict[int, List[ItemHargaGrosirModel]]:
+    """
+    active grosir tiers of the items, ordered by quantity
+    """
+    grouped: Dict[int, List[ItemHargaGrosirModel]] = {item_id: [] for item_id in item_ids}
+    for chunk in chunked(grouped):
+        rows: List[ItemHargaGrosir] = (await session.execute(grosirs_select(chunk))).scalars().all()
+        for row in rows:
+            grouped[row.IDItem].append(ItemHargaGrosirModel.from_orm(row))
+    return grouped
+
+
+async def load_promos(session: AsyncSession, item_ids: Iterable[int], today: date) -> Dict[int, List[ItemHargaPromoModel]]:
+    """
+    promos of the items active at ``today``, ordered by promo code
+    """
+    grouped: Dict[int, List[ItemHargaPromoModel]] = {item_id: [] for item_id in item_ids}
+    for chunk in chunked(grouped):
+        rows = (await session.execute(promos_select(chunk, today))).all()
+        for row in rows:
+            grouped[row.IDItem].append(ItemHargaPromoModel.from_orm(row))
+    return grouped
+
+
+async def lookup_plu_batch(
+    session: AsyncSession,
+    codes: Iterable[str],
+    today: Optional[date] = None,
+) -> Tuple[Dict[str, PluModel], Dict[str, str]]:
+    """
+    Get many items by Kode/Barcode, returns the found items and the error
+    messages, both keyed by the requested code in request order
+    """
+    if today is None:
+        today = date.today()
+
+    cache = get_price_cache()
+    found: Dict[str, Optional[PluModel]] = {}
+    pending: List[str] = []
+    for code in dict.fromkeys(codes):
+        found[code] = cache.lookup(code, today)
+        if found[code] is None:
+            pending.append(code)
+
+    items: Dict[str, Item] = {}
+    for chunk in chunked(pending):
+        by_barcode: Dict[str, Item] = {}
+        by_gtin: Dict[str, Item] = {}
+        by_kode: Dict[str, Item] = {}
+        for item in (await session.execute(items_by_codes_select(chunk))).scalars():
+            by_kode.setdefault(collation_key(item.Kode), item)
+            if item.Barcode:
+                by_barcode.setdefault(collation_key(item.Barcode), item)
+                gtin = normalize_barcode(item.Barcode)
+                if gtin is not None:
+                    by_gtin.setdefault(gtin, item)
+
+        for code in chunk:
+            # diprioritaskan yang barcode-nya sama
+            item = (
+                by_barcode.get(collation_key(code))
+                or by_gtin.get(normalize_barcode(code))
+                or by_kode.get(collation_key(code))
+            )
+            if item is not None:
+                items[code] = item
+
+    active_ids = {item.IDItem for item in items.values() if item.Aktif != 'Tidak'}
+    grosirs = await load_grosirs(session, active_ids)
+    promos = await load_promos(session, active_ids, today)
+
+    results: Dict[str, PluModel] = {}
+    errors: Dict[str, str] = {}
+    for code, plu in found.items():
+        if plu is not None:
+            results[code] = plu
+        elif code not in items:
+            errors[code] = not_found_message(code)
+        elif items[code].Aktif == 'Tidak':
+            errors[code] = inactive_message(code)
+        else:
+            item = items[code]
+            results[code] = PluModel(
+                item=ItemModel.from_orm(item),
+                hargaGrosir=grosirs[item.IDItem],
+                hargaPromo=promos[item.IDItem],
+            )
+    return results, errors
+
+
+def search_select(query: str, limit: int):
+    """
+    active items with every word of ``query`` in Nama, Singkatan, Kode or
+    KodePabrik, the same Kode first and then shorter names
+    """
+    return select(Item).where(
+        Item.Aktif == 'Ya',
+        *(
+            or_(*(
+                column.contains(word, autoescape=True)
+                for column in (Item.Nama, Item.Singkatan, Item.Kode, Item.KodePabrik)
+            ))
+            for word in words(query)
+        ),
+    ).order_by(
+        case((Item.Kode == query.strip(), 0), else_=1),
+        func.length(Item.Nama),
+        Item.IDItem,
+    ).limit(limit)
+
+
+async def search_plu(
+    session: AsyncSession,
+    query: str,
+    limit: int,
+    today: Optional[date] = None,
+) -> List[PluModel]:
+    """
+    Active items best matching ``query`` by name or code, best first.
+    Without the price cache only items containing every word are found.
+    """
+    limit = min(limit, get_settings().search_max_results)
+    cache = get_price_cache()
+    if cache.ready:
+        return cache.search(query, limit, today)
+
+    if not words(query):
+        return []
+    if today is None:
+        today = date.today()
+
+    items: List[Item] = (await session.execute(search_select(query, limit))).scalars().all()
+    item_ids = [item.IDItem for item in items]
+    grosirs = await load_grosirs(session, item_ids)
+    promos = await load_promos(session, item_ids, today)
+    return [
+        PluModel(
+            item=ItemModel.from_orm(item),
+            hargaGrosir=grosirs[item.IDItem],
+            hargaPromo=promos[item.IDItem],
+        )
+        for item in items
+    ]
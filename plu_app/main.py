@@ -1,12 +1,24 @@
 from typing import Union, Dict, Any
+import asyncio
+import logging
 import pathlib
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+import time
+# diimpor pertama, waktu impor modul lain ikut tercatat
+from .startup import startup_profile
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .version import get_version, get_program_name
-from .routers import item, graphql
-from .settings import is_dev_mode
+from .instrumentation import ServerTimingMiddleware
+from .http_cache import ImmutableStaticFiles, REVALIDATE_CACHE_CONTROL, is_not_modified, not_modified_response
+from .lazy_routes import add_lazy_routes, load_lazy_routes
+from .metadata import get_metadata
+from .version import get_version
+from .settings import get_settings, is_dev_mode
+from .server import mark_worker_ready
+
+# router, cache harga dan replika diimpor saat dipakai, agar impor modul ini cepat
+
+logger = logging.getLogger('plu_app.main')
 
 fast_api_kwargs: Dict[str, Any] = {}
 
@@ -27,10 +39,22 @@ app = FastAPI(
 # mount public static assets
 public_path = pathlib.Path(__file__).parent / 'public'
 assets_path = public_path / 'assets'
-app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
+app.mount("/assets", ImmutableStaticFiles(directory=assets_path), name="assets")
+
+add_lazy_routes(app, '/item', 'plu_app.routers.item')
+add_lazy_routes(app, '/graphql', 'plu_app.routers.graphql', prefix='/graphql')
+add_lazy_routes(app, '/metrics', 'plu_app.routers.metrics')
+add_lazy_routes(app, '/export', 'plu_app.routers.export')
+add_lazy_routes(app, '/tree', 'plu_app.routers.tree')
+
+
+def openapi() -> Dict[str, Any]:
+    # skema OpenAPI (/docs) harus memuat semua route
+    load_lazy_routes(app)
+    return FastAPI.openapi(app)
+
 
-app.include_router(item.router)
-app.include_router(graphql.router, prefix="/graphql")
+app.openapi = openapi  # type: ignore
 
 origins = [
     "http://localhost:3000",
@@ -43,16 +67,96 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware)
+
+@app.on_event('startup')
+async def load_metadata() -> None:
+    get_metadata()
+
+
+@app.on_event('startup')
+async def start_replica_sync() -> None:
+    if get_settings().replica_path:
+        from .replica import init_replica, run_replica_sync
+        await init_replica()
+        app.state.replica_task = asyncio.create_task(run_replica_sync())
+
+
+@app.on_event('startup')
+async def warm_up() -> None:
+    """
+    Uvicorn accepts connections only after the startup events, so a new
+    worker does not serve its first requests cold.  A database that cannot
+    be reached only delays the warm up to the first requests
+    """
+    settings = get_settings()
+    if not settings.startup_warm_up:
+        return
+    load_lazy_routes(app)
+    from .db import get_sessionmaker, warm_pool
+    from .item_tree import get_tree_index
+    from .price_cache import refresh_price_cache
+    try:
+        with startup_profile.step('database pool'):
+            await warm_pool()
+        if settings.price_cache_enabled:
+            with startup_profile.step('price cache'):
+                await refresh_price_cache()
+        with startup_profile.step('category tree'):
+            async with get_sessionmaker()() as session:
+                await get_tree_index().refresh(session)
+    except Exception:
+        logger.exception('Error warming up')
+
+
+@app.on_event('startup')
+async def start_price_cache() -> None:
+    if get_settings().price_cache_enabled:
+        from .price_cache import run_price_cache
+        app.state.price_cache_task = asyncio.create_task(run_price_cache())
+
+
+@app.on_event('startup')
+async def ready() -> None:
+    mark_worker_ready()
+    startup_profile.ready()
+
+
+@app.on_event('shutdown')
+async def stop_price_cache() -> None:
+    task = getattr(app.state, 'price_cache_task', None)
+    if task is not None:
+        task.cancel()
+
+
+@app.on_event('shutdown')
+async def stop_replica_sync() -> None:
+    task = getattr(app.state, 'replica_task', None)
+    if task is not None:
+        task.cancel()
+
 
 @app.get('/')
-async def index() -> Union[FileResponse, str]:
+async def index(request: Request) -> Union[Response, str]:
     index_path = public_path / 'index.html'
     if index_path.exists():
-        return FileResponse(index_path)
-    return get_program_name()
+        # index.html merujuk asset ber-hash, jadi harus selalu divalidasi ulang
+        response = FileResponse(
+            index_path,
+            stat_result=index_path.stat(),
+            headers={'Cache-Control': REVALIDATE_CACHE_CONTROL},
+        )
+        if is_not_modified(request, response.headers['etag']):
+            return not_modified_response(response.headers['etag'])
+        return response
+    return get_metadata().program_name
 
 
 @app.get('/info')
 async def info() -> str:
-    return get_program_name()
+    return get_metadata().program_name
+
+
+startup_profile.add('import', time.perf_counter() - startup_profile.started)
@@ -0,0 +1,28 @@
+from functools import lru_cache
+from pydantic import BaseModel
+from .settings import get_settings
+from .version import get_version, get_program_name
+
+
+class AppMetadata(BaseModel):
+    """
+    Values that do not change while the app is running
+    """
+    version: str
+    program_name: str
+    app_title: str
+    app_subtitle: str
+
+    class Config:
+        allow_mutation = False
+
+
+@lru_cache()
+def get_metadata() -> AppMetadata:
+    settings = get_settings()
+    return AppMetadata(
+        version=get_version(),
+        program_name=get_program_name(),
+        app_title=settings.app_title,
+        app_subtitle=settings.app_subtitle,
+    )
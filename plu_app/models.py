@@ -0,0 +1,128 @@
+from datetime import date, datetime
+from typing import Optional, List, Dict, Iterable, Tuple
+from enum import Enum
+from pydantic import BaseModel, constr, validator
+
+
+class YaTidakEnum(str, Enum):
+    ya = 'Ya'
+    tidak = 'Tidak'
+
+
+class ItemModel(BaseModel):
+    IDItem: int
+    Kode: constr(max_length=20)
+    Nama: Optional[constr(max_length=255)] = None
+    Singkatan: Optional[constr(max_length=20)] = None
+    Barcode: Optional[constr(max_length=20)] = None
+    KodePabrik: Optional[constr(max_length=30)] = None
+    JumlahDos: Optional[float] = 0.0
+    Satuan: Optional[constr(max_length=10)] = None
+    HargaNormal: float = 0.0
+    HargaJual: Optional[float] = 0.0
+
+    class Config:
+        orm_mode = True
+
+
+class ItemHargaGrosirModel(BaseModel):
+    IDItemHargaGrosir: int
+    IDItem: int
+    Jumlah: float = 0.0
+    Harga: float = 0.0
+    IsDos: YaTidakEnum
+
+    class Config:
+        orm_mode = True
+
+
+class ItemHargaPromoModel(BaseModel):
+    IDItemHargaD: int
+    IDItemHargaH: int
+    IDItem: int
+    Kode: constr(max_length=30)
+    Nama: constr(max_length=50)
+    TanggalAwal: date
+    TanggalAkhir: date
+    Keterangan: Optional[str] = None
+    HargaJual: float = 0.0
+    DiskonPersen: float = 0.0
+    Diskon: float = 0.0
+
+    class Config:
+        orm_mode = True
+
+
+class ItemTreeModel(BaseModel):
+    IDItemTree: int
+    TreePath: constr(max_length=255)
+    Kode: constr(max_length=20)
+    Nama: constr(max_length=50)
+    FullPath: constr(max_length=255)
+
+    class Config:
+        orm_mode = True
+
+
+def promo_price(harga_normal: float, harga_jual: float, diskon: float, diskon_persen: float) -> Optional[float]:
+    """
+    unit price of a promo row, its HargaJual or else HargaNormal less its
+    Diskon or DiskonPersen; None for a row without any of them
+    """
+    if harga_jual > 0:
+        return harga_jual
+    if diskon > 0:
+        return max(harga_normal - diskon, 0.0)
+    if diskon_persen > 0:
+        return harga_normal * (1 - diskon_persen / 100)
+    return None
+
+
+def effective_price(
+    harga_jual: Optional[float],
+    harga_normal: float,
+    promos: Iterable[Tuple[float, float, float]],
+) -> float:
+    """
+    lowest of the selling price and the prices of the promos, given as
+    (HargaJual, Diskon, DiskonPersen)
+    """
+    prices = (promo_price(harga_normal, *promo) for promo in promos)
+    return min([harga_jual or harga_normal, *(price for price in prices if price is not None)])
+
+
+class PluModel(BaseModel):
+    item: ItemModel
+    hargaGrosir: List[ItemHargaGrosirModel] = []
+    hargaPromo: List[ItemHargaPromoModel] = []
+    # harga satuan terendah pada tanggal hargaPromo, dihitung dari field di atas
+    hargaEfektif: float = 0.0
+
+    @validator('hargaEfektif', always=True)
+    def compute_harga_efektif(cls, value, values):
+        if 'item' not in values:
+            return value
+        item: ItemModel = values['item']
+        return effective_price(
+            item.HargaJual,
+            item.HargaNormal,
+            ((promo.HargaJual, promo.Diskon, promo.DiskonPersen) for promo in values.get('hargaPromo', [])),
+        )
+
+
+class PluBatchRequest(BaseModel):
+    codes: List[constr(max_length=20)]
+
+
+class PluBatchModel(BaseModel):
+    # keyed by the requested Kode/Barcode
+    items: Dict[str, PluModel] = {}
+    errors: Dict[str, str] = {}
+
+
+class PluChangesModel(BaseModel):
+    # kirim kembali sebagai since pada permintaan berikutnya
+    watermark: datetime
+    items: List[PluModel] = []
+    # IDItem yang sudah tidak aktif
+    removed: List[int] = []
@@ -0,0 +1,531 @@
+"""
+In-process snapshot of active items with their bulk and promo prices.
+
+The snapshot is keyed by ``Kode`` and ``Barcode`` so scans can be answered
+from memory.  Items, grosir tiers and the code and search indexes live in a
+compact CatalogStore, which the workers of a host share through a memory
+mapped file when ``catalog_store_path`` is set.  It is refreshed incrementally by polling
+``UpdateTime`` and ``InsertTime`` on ``mitem`` and ``titemhargah``, changed
+items are kept next to the store until the next full reload.  The periodic
+full reload picks up what polling cannot see (deleted rows, grosir or promo
+detail rows edited without touching their parent).  Building the store and
+the indexes of a full reload runs in a thread, the old snapshot keeps
+serving until the new one is swapped in.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Optional, Union, List, Dict, Tuple, Iterable, Iterator, AsyncIterator
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+from sqlalchemy import select, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from . import db
+from .barcode import normalize_barcode
+from .catalog_store import ITEM_STRINGS, ITEM_FLOATS, CatalogBuilder, CatalogStore
+from .encoding import encode_plu
+from .models import ItemModel, ItemHargaGrosirModel, ItemHargaPromoModel, PluModel, effective_price
+from .promo_index import PromoIndex
+from .search_index import SearchIndex
+from .schema import Item, ItemHarga, ItemHargaD, ItemHargaGrosir
+from .settings import get_settings
+
+
+logger = logging.getLogger('plu_app.price_cache')
+
+# batas jumlah parameter dalam satu klausa IN (...)
+IN_CHUNK_SIZE = 1000
+
+
+def chunked(values: Iterable[int], size: int = IN_CHUNK_SIZE) -> Iterator[List[int]]:
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def max_timestamp(*values: Optional[datetime]) -> Optional[datetime]:
+    present = [value for value in values if value is not None]
+    return max(present) if present else None
+
+
+async def read_watermark(session: Union[AsyncSession, AsyncConnection], update_time, insert_time) -> datetime:
+    """
+    Latest of the two timestamp columns, or now when they are all NULL so
+    that polling does not rescan the whole table
+    """
+    started = datetime.now()
+    latest = max_timestamp(*(await session.execute(
+        select(func.max(update_time), func.max(insert_time))
+    )).one())
+    return latest or started
+
+
+class PriceCache:
+    """
+    Snapshot of active items, their active grosir tiers and their promos
+    that have not ended yet, indexed by date range.  PLUs are assembled on
+    lookup without validation, for today or later dates.
+    """
+
+    def __init__(self) -> None:
+        self.store = CatalogStore.empty()
+        # barang yang berubah sejak store dibuat, None jika tidak aktif
+        self.changed_items: Dict[int, Optional[ItemModel]] = {}
+        self.changed_grosirs: Dict[int, List[ItemHargaGrosirModel]] = {}
+        # Kode dan Barcode barang yang berubah sejak store dibuat, termasuk
+        # yang tidak aktif; kode barang lain dicari di store
+        self.keys: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.by_kode: Dict[str, int] = {}
+        self.by_barcode: Dict[str, int] = {}
+        # Barcode dalam bentuk GTIN-14, lihat barcode.normalize_barcode
+        self.by_gtin: Dict[str, int] = {}
+        self.promos = PromoIndex()
+        self.search_index = SearchIndex()
+        # PLU pada loaded_on yang terakhir dipakai, lihat price_cache_plu_size
+        self.plus: 'OrderedDict[int, PluModel]' = OrderedDict()
+        # JSON PLU pada loaded_on, dibuat saat pertama dicari
+        self.encoded: Dict[int, bytes] = {}
+        self.item_watermark: Optional[datetime] = None
+        self.promo_watermark: Optional[datetime] = None
+        self.loaded_at: Optional[datetime] = None
+        self.loaded_on: Optional[date] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def find(self, code: str) -> Optional[int]:
+        """
+        IDItem by Barcode, by an equivalent EAN/UPC form of it or by Kode,
+        in that order.  Returns None if the snapshot is not loaded or the
+        code is unknown to it
+        """
+        if not self.ready:
+            return None
+
+        # kode/barcode milik barang tidak aktif juga dicatat, agar prioritas
+        # barcode sama dengan query ke database
+        item_id = self._find_key('barcode', self.by_barcode, code)
+        if item_id is None:
+            gtin = normalize_barcode(code)
+            if gtin is not None:
+                item_id = self._find_key('gtin', self.by_gtin, gtin)
+        if item_id is None:
+            item_id = self._find_key('kode', self.by_kode, code)
+        return item_id
+
+    def _find_key(self, name: str, changed: Dict[str, int], value: str) -> Optional[int]:
+        item_id = changed.get(value)
+        if item_id is not None:
+            return item_id
+        for row in self.store.find_key(name, value):
+            item_id = self.store.item_ids[row]
+            # kode barang yang sudah berubah ada di changed
+            if item_id not in self.changed_items:
+                return item_id
+        return None
+
+    def lookup(self, code: str, today: Optional[date] = None) -> Optional[PluModel]:
+        item_id = self.find(code)
+        if item_id is None:
+            return None
+        return self.get_plu(item_id, today)
+
+    def lookup_json(self, code: str, today: Optional[date] = None) -> Optional[bytes]:
+        """
+        Like ``lookup`` but returns the PLU encoded as JSON, kept for
+        today's PLUs until the item or its promos change
+        """
+        item_id = self.find(code)
+        if item_id is None:
+            return None
+
+        if today is None:
+            today = date.today()
+        if today == self.loaded_on:
+            content = self.encoded.get(item_id)
+            if content is not None:
+                return content
+
+        plu = self.get_plu(item_id, today)
+        if plu is None:
+            return None
+        content = encode_plu(plu)
+        if today == self.loaded_on and get_settings().price_cache_json:
+            self.encoded[item_id] = content
+        return content
+
+    def search(self, query: str, limit: int, today: Optional[date] = None) -> List[PluModel]:
+        """
+        Active items best matching ``query`` by Nama, Singkatan, Kode or
+        KodePabrik
+        """
+        plus = (
+            self.get_plu(item_id, today)
+            for item_id, _ in self.search_index.search(query, limit)
+        )
+        return [plu for plu in plus if plu is not None]
+
+    def get_item(self, item_id: int) -> Optional[ItemModel]:
+        if item_id in self.changed_items:
+            return self.changed_items[item_id]
+        return self.store.get_item(item_id)
+
+    def get_grosirs(self, item_id: int) -> List[ItemHargaGrosirModel]:
+        if item_id in self.changed_grosirs:
+            return self.changed_grosirs[item_id]
+        return self.store.get_grosirs(item_id)
+
+    def get_plu(self, item_id: int, today: Optional[date] = None) -> Optional[PluModel]:
+        """
+        PLU of an active item at ``today``, None for dates before the
+        snapshot since promos that have ended are not kept
+        """
+        if today is None:
+            today = date.today()
+
+        if self.loaded_on is None or today < self.loaded_on:
+            return None
+
+        if today == self.loaded_on:
+            plu = self.plus.get(item_id)
+            if plu is not None:
+                self.plus.move_to_end(item_id)
+                return plu
+
+        item = self.get_item(item_id)
+        if item is None:
+            return None
+
+        promos = self.promos.at(item_id, today)
+        plu = PluModel.construct(
+            item=item,
+            hargaGrosir=self.get_grosirs(item_id),
+            hargaPromo=promos,
+            hargaEfektif=effective_price(
+                item.HargaJual,
+                item.HargaNormal,
+                ((promo.HargaJual, promo.Diskon, promo.DiskonPersen) for promo in promos),
+            ),
+        )
+        if today == self.loaded_on:
+            self.plus[item_id] = plu
+            while len(self.plus) > get_settings().price_cache_plu_size:
+                self.plus.popitem(last=False)
+        return plu
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Full reload, the new snapshot replaces the old one at once
+        """
+        snapshot = PriceCache()
+        today = date.today()
+
+        path = get_settings().catalog_store_path
+        if path:
+            snapshot.store = await load_shared_store(session, path)
+        else:
+            snapshot.store = await build_store(session)
+
+        await asyncio.get_running_loop().run_in_executor(None, snapshot._index_store)
+        snapshot.item_watermark = parse_timestamp(snapshot.store.meta.get('item_watermark'))
+
+        snapshot.promo_watermark = await read_watermark(session, ItemHarga.UpdateTime, ItemHarga.InsertTime)
+        await stream_rows(
+            session,
+            promo_select(today),
+            lambda row: snapshot.promos.put(ItemHargaPromoModel.from_orm(row)),
+        )
+
+        snapshot.loaded_on = today
+        snapshot.loaded_at = datetime.now()
+        self.__dict__.update(snapshot.__dict__)
+        logger.info('price cache loaded %d items', len(self.store))
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """
+        Apply changes since the last poll, or reload everything when the
+        full refresh interval has passed
+        """
+        settings = get_settings()
+        if (
+            not self.ready
+            or datetime.now() - self.loaded_at >= timedelta(seconds=settings.price_cache_full_refresh_seconds)
+        ):
+            await self.load(session)
+            return
+
+        today = date.today()
+        if self.loaded_on != today:
+            self.invalidate(self.promos.changed_between(self.loaded_on, today))
+            self.promos.remove_ended(today)
+            self.loaded_on = today
+
+        await self._refresh_items(session)
+        await self._refresh_promos(session, today)
+
+    async def _refresh_items(self, session: AsyncSession) -> None:
+        items = list((await session.execute(changed_items_select(self.item_watermark))).scalars())
+
+        # harga grosir tidak punya UpdateTime, dimuat ulang mengikuti item-nya
+        grosirs: Dict[int, List[ItemHargaGrosirModel]] = {item.IDItem: [] for item in items}
+        for chunk in chunked(grosirs):
+            for grosir in (await session.execute(
+                grosir_select().where(ItemHargaGrosir.IDItem.in_(chunk))
+            )).scalars():
+                grosirs[grosir.IDItem].append(ItemHargaGrosirModel.from_orm(grosir))
+
+        # tanpa await sampai selesai, agar lookup tidak menyimpan JSON
+        # dari item yang grosirnya belum diganti
+        for item in items:
+            self.item_watermark = max_timestamp(
+                self.item_watermark, item.UpdateTime, item.InsertTime
+            )
+            self._remove_item(item.IDItem)
+            self._put_item(item)
+        self.changed_grosirs.update(grosirs)
+
+        if items:
+            logger.debug('price cache refreshed %d items', len(items))
+
+    async def _refresh_promos(self, session: AsyncSession, today: date) -> None:
+        changed = (await session.execute(changed_promos_select(self.promo_watermark))).all()
+        header_ids = [row.IDItemHargaH for row in changed]
+
+        promos: List[ItemHargaPromoModel] = []
+        for chunk in chunked(header_ids):
+            for row in (await session.execute(
+                promo_select(today).where(ItemHarga.IDItemHargaH.in_(chunk))
+            )):
+                promos.append(ItemHargaPromoModel.from_orm(row))
+
+        # diganti sekaligus tanpa await, lihat _refresh_items
+        for row in changed:
+            self.promo_watermark = max_timestamp(
+                self.promo_watermark, row.UpdateTime, row.InsertTime
+            )
+            self.invalidate(self.promos.remove(row.IDItemHargaH))
+        for promo in promos:
+            self.promos.put(promo)
+        self.invalidate(promo.IDItem for promo in promos)
+
+        if header_ids:
+            logger.debug('price cache refreshed %d promos', len(header_ids))
+
+    def invalidate(self, item_ids: Iterable[int]) -> None:
+        for item_id in item_ids:
+            self.plus.pop(item_id, None)
+            self.encoded.pop(item_id, None)
+
+    def _index_store(self) -> None:
+        """
+        Index the search postings of the store, run outside the event loop
+        """
+        self.search_index = SearchIndex(self.store.postings())
+
+    def _index_codes(self, item_id: int, kode: str, barcode: Optional[str]) -> None:
+        self.keys[item_id] = (kode, barcode)
+        self.by_kode[kode] = item_id
+        if barcode:
+            self.by_barcode[barcode] = item_id
+            gtin = normalize_barcode(barcode)
+            if gtin is not None:
+                self.by_gtin[gtin] = item_id
+
+    def _put_item(self, item: Item) -> None:
+        self._index_codes(item.IDItem, item.Kode, item.Barcode)
+        if item.Aktif == 'Ya':
+            model = self.changed_items[item.IDItem] = ItemModel.from_orm(item)
+            self.search_index.put(model)
+
+    def _remove_item(self, item_id: int) -> None:
+        self.changed_items[item_id] = None
+        self.invalidate((item_id,))
+        self.search_index.remove(item_id)
+        kode, barcode = self.keys.pop(item_id, (None, None))
+        if kode is not None and self.by_kode.get(kode) == item_id:
+            del self.by_kode[kode]
+        if barcode and self.by_barcode.get(barcode) == item_id:
+            del self.by_barcode[barcode]
+        gtin = normalize_barcode(barcode)
+        if gtin is not None and self.by_gtin.get(gtin) == item_id:
+            del self.by_gtin[gtin]
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def grosir_select():
+    return select(ItemHargaGrosir).where(
+        ItemHargaGrosir.Aktif == 'Ya'
+    ).order_by(
+        ItemHargaGrosir.IDItem,
+        ItemHargaGrosir.Jumlah,
+    )
+
+
+def add_rows(add: Callable[[Any], None], rows: Iterable[Any]) -> None:
+    for row in rows:
+        add(row)
+
+
+async def stream_rows(session: AsyncSession, statement, add: Callable[[Any], None]) -> None:
+    """
+    Pass every row of ``statement`` to ``add``, called outside the event
+    loop a chunk of rows at a time
+    """
+    loop = asyncio.get_running_loop()
+    result = await session.stream(statement.execution_options(yield_per=IN_CHUNK_SIZE))
+    async for rows in result.partitions():
+        await loop.run_in_executor(None, add_rows, add, rows)
+
+
+async def build_store(session: AsyncSession) -> CatalogStore:
+    """
+    Read every item and active grosir tier into a new store
+    """
+    item_watermark = await read_watermark(session, Item.UpdateTime, Item.InsertTime)
+
+    # kolom saja, tanpa objek ORM
+    builder = CatalogBuilder()
+    await stream_rows(session, select(
+        Item.IDItem, Item.Aktif, *(getattr(Item, name) for name in ITEM_STRINGS + ITEM_FLOATS)
+    ).order_by(Item.IDItem), builder.add_item)
+    await stream_rows(session, grosir_select().with_only_columns(
+        ItemHargaGrosir.IDItemHargaGrosir,
+        ItemHargaGrosir.IDItem,
+        ItemHargaGrosir.Jumlah,
+        ItemHargaGrosir.Harga,
+        ItemHargaGrosir.IsDos,
+    ), builder.add_grosir)
+
+    meta = {
+        'item_watermark': item_watermark.isoformat(),
+        'built_at': datetime.now().isoformat(),
+    }
+    return await asyncio.get_running_loop().run_in_executor(None, builder.build, meta)
+
+
+async def load_shared_store(session: AsyncSession, path: str) -> CatalogStore:
+    """
+    Map the store file at ``path``; one worker at a time rebuilds it from
+    the database when it is older than the full refresh interval
+    """
+    max_age = timedelta(seconds=get_settings().price_cache_full_refresh_seconds)
+    async with file_lock(path + '.lock'):
+        if os.path.exists(path):
+            try:
+                store = CatalogStore.open(path)
+            except ValueError:
+                # dibuat versi sebelumnya
+                logger.warning('rebuilding catalog store %s', path)
+            else:
+                built_at = parse_timestamp(store.meta.get('built_at'))
+                if built_at is not None and datetime.now() - built_at < max_age:
+                    return store
+
+        store = await build_store(session)
+        await asyncio.get_running_loop().run_in_executor(None, store.save, path)
+        return CatalogStore.open(path)
+
+
+@asynccontextmanager
+async def file_lock(path: str) -> AsyncIterator[None]:
+    """
+    Exclusive lock between worker processes, waits without blocking the
+    event loop
+    """
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.1)
+        yield
+
+
+def changed_items_select(watermark: datetime):
+    return select(Item).where(
+        or_(
+            Item.UpdateTime >= watermark,
+            Item.InsertTime >= watermark,
+        )
+    )
+
+
+def changed_promos_select(watermark: datetime):
+    return select(ItemHarga.IDItemHargaH, ItemHarga.UpdateTime, ItemHarga.InsertTime).where(
+        or_(
+            ItemHarga.UpdateTime >= watermark,
+            ItemHarga.InsertTime >= watermark,
+        )
+    )
+
+
+def promo_select(today: date):
+    """
+    promo detail rows of active promo that have not ended at ``today``
+    """
+    return select(
+        ItemHargaD.IDItemHargaD,
+        ItemHargaD.IDItemHargaH,
+        ItemHargaD.IDItem,
+        ItemHarga.Kode,
+        ItemHarga.Nama,
+        ItemHarga.TanggalAwal,
+        ItemHarga.TanggalAkhir,
+        ItemHarga.Keterangan,
+        ItemHargaD.HargaJual,
+        ItemHargaD.DiskonPersen,
+        ItemHargaD.Diskon,
+    ).join_from(
+        ItemHarga,
+        ItemHargaD,
+        ItemHarga.IDItemHargaH == ItemHargaD.IDItemHargaH,
+    ).where(
+        and_(
+            ItemHarga.Aktif == 'Ya',
+            ItemHarga.TanggalAkhir >= today,
+        )
+    )
+
+
+@lru_cache()
+def get_price_cache() -> PriceCache:
+    return PriceCache()
+
+
+async def refresh_price_cache() -> None:
+    async with db.get_sessionmaker()() as session:
+        await get_price_cache().refresh(session)
+
+
+async def run_price_cache() -> None:
+    """
+    background task polling the database for changes
+    """
+    settings = get_settings()
+    while True:
+        try:
+            await refresh_price_cache()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Error refreshing price cache')
+        await asyncio.sleep(settings.price_cache_poll_seconds)
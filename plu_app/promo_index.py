@@ -0,0 +1,137 @@
+"""
+Interval index of promo date ranges per item.
+
+The promos of an item are cut at every TanggalAwal and every day after a
+TanggalAkhir into windows in which the set of promos in effect does not
+change.  The promos in effect on a date are then found by bisecting the
+window starts, in logarithmic time whatever the number of promos.
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Dict, List, Set, Tuple, Iterable, Optional
+
+from .models import ItemHargaPromoModel
+
+
+class PromoWindows:
+    """
+    Promos of one item, ``windows[i]`` is in effect from ``starts[i]``
+    until the day before ``starts[i + 1]``
+    """
+
+    __slots__ = ('starts', 'windows')
+
+    def __init__(self, promos: Iterable[ItemHargaPromoModel]) -> None:
+        promos = sorted(promos, key=lambda promo: promo.Kode)
+        bounds: Set[date] = set()
+        for promo in promos:
+            bounds.add(promo.TanggalAwal)
+            if promo.TanggalAkhir < date.max:
+                bounds.add(promo.TanggalAkhir + timedelta(days=1))
+
+        self.starts: List[date] = sorted(bounds)
+        self.windows: List[Tuple[ItemHargaPromoModel, ...]] = [
+            tuple(
+                promo
+                for promo in promos
+                if promo.TanggalAwal <= start <= promo.TanggalAkhir
+            )
+            for start in self.starts
+        ]
+
+    def at(self, day: date) -> Tuple[ItemHargaPromoModel, ...]:
+        index = bisect_right(self.starts, day) - 1
+        if index < 0:
+            return ()
+        return self.windows[index]
+
+    def changes_between(self, before: date, after: date) -> bool:
+        """
+        whether the promos in effect on both dates may differ
+        """
+        if after < before:
+            before, after = after, before
+        return bisect_right(self.starts, after) != bisect_right(self.starts, before)
+
+
+class PromoIndex:
+    """
+    Promo detail rows by IDItem and by IDItemHargaH, the windows of an item
+    are rebuilt on the first query after its promos changed
+    """
+
+    def __init__(self) -> None:
+        self.promos: Dict[int, List[ItemHargaPromoModel]] = {}
+        # IDItemHargaH -> IDItem yang ada di promo tersebut
+        self.promo_items: Dict[int, Set[int]] = {}
+        self.windows: Dict[int, PromoWindows] = {}
+
+    def __len__(self) -> int:
+        return len(self.promo_items)
+
+    def at(self, item_id: int, day: date) -> List[ItemHargaPromoModel]:
+        """
+        promos of ``item_id`` in effect on ``day`` ordered by promo Kode
+        """
+        windows = self.get_windows(item_id)
+        if windows is None:
+            return []
+        return list(windows.at(day))
+
+    def get_windows(self, item_id: int) -> Optional[PromoWindows]:
+        windows = self.windows.get(item_id)
+        if windows is None:
+            promos = self.promos.get(item_id)
+            if not promos:
+                return None
+            windows = self.windows[item_id] = PromoWindows(promos)
+        return windows
+
+    def changed_between(self, before: date, after: date) -> Set[int]:
+        """
+        IDItem whose promos in effect may differ between both dates
+        """
+        return {
+            item_id
+            for item_id in self.promos
+            if self.get_windows(item_id).changes_between(before, after)
+        }
+
+    def put(self, promo: ItemHargaPromoModel) -> None:
+        self.promos.setdefault(promo.IDItem, []).append(promo)
+        self.promo_items.setdefault(promo.IDItemHargaH, set()).add(promo.IDItem)
+        self.windows.pop(promo.IDItem, None)
+
+    def remove(self, header_id: int) -> Set[int]:
+        """
+        remove a promo header, returns the IDItem it covered
+        """
+        item_ids = self.promo_items.pop(header_id, set())
+        for item_id in item_ids:
+            self.windows.pop(item_id, None)
+            promos = [
+                promo
+                for promo in self.promos.get(item_id, [])
+                if promo.IDItemHargaH != header_id
+            ]
+            if promos:
+                self.promos[item_id] = promos
+            else:
+                self.promos.pop(item_id, None)
+        return item_ids
+
+    def remove_ended(self, day: date) -> Set[int]:
+        """
+        remove promo headers that ended before ``day``, returns the IDItem
+        they covered
+        """
+        ended = {
+            promo.IDItemHargaH
+            for promos in self.promos.values()
+            for promo in promos
+            if promo.TanggalAkhir < day
+        }
+        item_ids: Set[int] = set()
+        for header_id in ended:
+            item_ids.update(self.remove(header_id))
+        return item_ids
@@ -0,0 +1,260 @@
+"""
+Local SQLite replica of the price tables for store-edge deployments.
+
+When ``replica_path`` is set the app reads from the SQLite file, so
+lookups keep working while the link to the central MySQL is down.  A
+background task copies ``mitem``, ``mitemhargagrosir``, ``titemhargah``,
+``titemhargad`` and ``mitemtree`` from MySQL: changed items and promo
+headers by polling ``UpdateTime`` and ``InsertTime``, everything on a
+periodic full sync that also removes deleted rows.  Needs ``aiosqlite``.
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, List, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+import sqlalchemy as sa
+from sqlalchemy import event, select, insert, delete, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncConnection
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .price_cache import chunked, max_timestamp, read_watermark
+from .schema import metadata, Item, ItemTree, ItemHarga, ItemHargaD, ItemHargaGrosir
+from .settings import get_settings
+
+
+logger = logging.getLogger('plu_app.replica')
+
+REPLICA_TABLES = [
+    ItemTree.__table__,
+    Item.__table__,
+    ItemHargaGrosir.__table__,
+    ItemHarga.__table__,
+    ItemHargaD.__table__,
+]
+
+COPY_CHUNK_SIZE = 1000
+
+state_metadata = sa.MetaData()
+
+# watermark dan waktu sinkronisasi, disimpan di file replika
+replica_state = sa.Table(
+    'replica_state',
+    state_metadata,
+    sa.Column('name', sa.String(30), primary_key=True),
+    sa.Column('value', sa.DateTime),
+)
+
+
+def configure_replica_engine(engine: Engine, read_only: bool) -> None:
+    """
+    WAL journal lets readers see the last committed sync while the next
+    one is written
+    """
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+
+
+@lru_cache()
+def get_replica_writer() -> AsyncEngine:
+    engine = create_async_engine(get_settings().get_replica_url())
+    configure_replica_engine(engine.sync_engine, read_only=False)
+    return engine
+
+
+@lru_cache()
+def get_source_engine() -> AsyncEngine:
+    settings = get_settings()
+    return create_async_engine(
+        settings.get_async_db_url(),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+    )
+
+
+def create_replica_schema(connection: sa.engine.Connection) -> None:
+    from .index_advisor import RECOMMENDED_INDEXES, index_name
+
+    metadata.create_all(connection, tables=REPLICA_TABLES)
+    state_metadata.create_all(connection)
+    tables = {table.name: table for table in REPLICA_TABLES}
+    for table_name, columns, _ in RECOMMENDED_INDEXES:
+        table = tables[table_name]
+        sa.Index(
+            index_name(table_name, columns),
+            *(table.c[column] for column in columns),
+        ).create(connection, checkfirst=True)
+
+
+def changed_select(watermark: datetime, key: sa.Column, update_time: sa.Column, insert_time: sa.Column):
+    return select(key, update_time, insert_time).where(
+        or_(
+            update_time >= watermark,
+            insert_time >= watermark,
+        )
+    )
+
+
+async def read_state(replica: AsyncConnection, name: str) -> Optional[datetime]:
+    return (await replica.execute(
+        select(replica_state.c.value).where(replica_state.c.name == name)
+    )).scalar_one_or_none()
+
+
+async def write_state(replica: AsyncConnection, name: str, value: Optional[datetime]) -> None:
+    await replica.execute(delete(replica_state).where(replica_state.c.name == name))
+    await replica.execute(insert(replica_state).values(name=name, value=value))
+
+
+async def copy_rows(source: AsyncConnection, replica: AsyncConnection, table: sa.Table, statement) -> None:
+    result = await source.stream(statement.execution_options(yield_per=COPY_CHUNK_SIZE))
+    async for rows in result.partitions(COPY_CHUNK_SIZE):
+        await replica.execute(insert(table), [dict(row._mapping) for row in rows])
+
+
+async def full_sync(source: AsyncConnection, replica: AsyncConnection) -> None:
+    item_watermark = await read_watermark(source, Item.UpdateTime, Item.InsertTime)
+    promo_watermark = await read_watermark(source, ItemHarga.UpdateTime, ItemHarga.InsertTime)
+
+    for table in reversed(REPLICA_TABLES):
+        await replica.execute(delete(table))
+    for table in REPLICA_TABLES:
+        await copy_rows(source, replica, table, select(table))
+
+    await write_state(replica, 'item_watermark', item_watermark)
+    await write_state(replica, 'promo_watermark', promo_watermark)
+    await write_state(replica, 'full_sync', datetime.now())
+    logger.info('replica fully synced')
+
+
+async def replace_rows(
+    source: AsyncConnection,
+    replica: AsyncConnection,
+    table: sa.Table,
+    column: sa.Column,
+    ids: Iterable[int],
+) -> None:
+    """
+    replace the replica rows of ``table`` whose ``column`` is in ``ids``
+    """
+    for chunk in chunked(ids):
+        await replica.execute(delete(table).where(table.c[column.key].in_(chunk)))
+        await copy_rows(source, replica, table, select(table).where(table.c[column.key].in_(chunk)))
+
+
+async def sync_changes(source: AsyncConnection, replica: AsyncConnection) -> None:
+    # replika lama bisa tanpa watermark, dicari sejak sinkronisasi penuh
+    last_full_sync = await read_state(replica, 'full_sync')
+    item_watermark = await read_state(replica, 'item_watermark') or last_full_sync
+    item_ids: List[int] = []
+    for row in await source.execute(
+        changed_select(item_watermark, Item.IDItem, Item.UpdateTime, Item.InsertTime)
+    ):
+        item_watermark = max_timestamp(item_watermark, row.UpdateTime, row.InsertTime)
+        item_ids.append(row.IDItem)
+
+    promo_watermark = await read_state(replica, 'promo_watermark') or last_full_sync
+    header_ids: List[int] = []
+    for row in await source.execute(
+        changed_select(promo_watermark, ItemHarga.IDItemHargaH, ItemHarga.UpdateTime, ItemHarga.InsertTime)
+    ):
+        promo_watermark = max_timestamp(promo_watermark, row.UpdateTime, row.InsertTime)
+        header_ids.append(row.IDItemHargaH)
+
+    # harga grosir dan detail promo tidak punya UpdateTime, ikut induknya
+    await replace_rows(source, replica, Item.__table__, Item.IDItem, item_ids)
+    await replace_rows(source, replica, ItemHargaGrosir.__table__, ItemHargaGrosir.IDItem, item_ids)
+    await replace_rows(source, replica, ItemHarga.__table__, ItemHarga.IDItemHargaH, header_ids)
+    await replace_rows(source, replica, ItemHargaD.__table__, ItemHargaD.IDItemHargaH, header_ids)
+
+    # kategori hanya sedikit, disalin ulang seluruhnya
+    await replica.execute(delete(ItemTree.__table__))
+    await copy_rows(source, replica, ItemTree.__table__, select(ItemTree.__table__))
+
+    await write_state(replica, 'item_watermark', item_watermark)
+    await write_state(replica, 'promo_watermark', promo_watermark)
+    if item_ids or header_ids:
+        logger.debug('replica synced %d items and %d promos', len(item_ids), len(header_ids))
+
+
+@contextmanager
+def sync_lock() -> Iterator[bool]:
+    """
+    Exclusive lock on a file next to the replica, yields False when another
+    worker process holds it, so only one of them writes the replica
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    with open(get_settings().replica_path + '.lock', 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+        else:
+            yield True
+
+
+async def init_replica() -> None:
+    """
+    create the replica tables, so the app can start before the first sync
+    """
+    with sync_lock() as locked:
+        if locked:
+            async with get_replica_writer().begin() as replica:
+                await replica.run_sync(create_replica_schema)
+
+
+async def sync_replica() -> None:
+    """
+    One sync in one replica transaction, readers see either the previous
+    or the new state
+    """
+    settings = get_settings()
+    with sync_lock() as locked:
+        if not locked:
+            return
+        async with get_replica_writer().begin() as replica:
+            last_full_sync = await read_state(replica, 'full_sync')
+            async with get_source_engine().connect() as source:
+                if (
+                    last_full_sync is None
+                    or datetime.now() - last_full_sync >= timedelta(seconds=settings.replica_full_sync_seconds)
+                ):
+                    await full_sync(source, replica)
+                else:
+                    await sync_changes(source, replica)
+
+
+async def run_replica_sync() -> None:
+    """
+    background task catching the replica up with MySQL, failures are
+    logged and the replica keeps serving its last state
+    """
+    settings = get_settings()
+    while True:
+        try:
+            await sync_replica()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Error syncing replica')
+        await asyncio.sleep(settings.replica_sync_seconds)
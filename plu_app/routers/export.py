@@ -0,0 +1,56 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_session
+from ..export import pricebook_select, stream_export, load_changes
+from ..models import PluChangesModel
+
+
+router = APIRouter(
+    prefix='/export',
+    tags=['export']
+)
+
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: 'application/x-ndjson',
+    ExportFormat.csv: 'text/csv',
+}
+
+
+@router.get('/pricebook')
+async def export_pricebook(
+    format: ExportFormat = ExportFormat.ndjson,
+    at: Optional[date] = None,
+):
+    """
+    Stream every active item with its grosir and promo prices at date
+    ``at`` (default today), to preview upcoming price changes
+    """
+    return StreamingResponse(
+        stream_export(pricebook_select(), format.value, at),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': 'attachment; filename="pricebook.{}"'.format(format.value),
+        },
+    )
+
+
+@router.get('/changes', response_model=PluChangesModel)
+async def export_changes(
+    since: datetime,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Items whose prices changed since the watermark of the previous call,
+    plus the watermark for the next call
+    """
+    return await load_changes(session, since)
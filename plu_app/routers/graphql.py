@@ -1,8 +1,10 @@
+import asyncio
 from fastapi import Depends
 from strawberry.fastapi import GraphQLRouter
 
 from ..settings import is_dev_mode
 from ..db import get_session
+from ..graphql.loaders import create_loaders
 from ..graphql.schema import schema
 
 
@@ -10,10 +12,14 @@ async def get_context(
     session=Depends(get_session),
 ):
     """
-    Injecting orm session object into the context
+    Injecting orm session object and the price loaders into the context,
+    resolvers share the session through the lock
     """
+    session_lock = asyncio.Lock()
     return {
-        'session': session
+        'session': session,
+        'session_lock': session_lock,
+        **create_loaders(session, session_lock),
     }
 
 
@@ -0,0 +1,64 @@
+from typing import Optional, Dict, Any
+from fastapi import APIRouter
+from pydantic import BaseModel
+from ..db import get_pool_metrics
+from ..instrumentation import get_metrics
+from ..startup import startup_profile
+
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['metrics']
+)
+
+
+class RequestMetricsModel(BaseModel):
+    # keyed by 'METHOD /path' and 'Type.field'
+    routes: Dict[str, Dict[str, Any]]
+    graphql: Dict[str, Dict[str, Any]]
+
+
+class PoolMetricsModel(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    connects: int
+    checkouts: int
+    checkins: int
+    invalidations: int
+    wait_count: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class StartupMetricsModel(BaseModel):
+    # None selama worker belum siap
+    seconds: Optional[float]
+    # detik per langkah, termasuk router yang dimuat saat request pertama
+    steps: Dict[str, float]
+
+
+@router.get('', response_model=RequestMetricsModel)
+async def request_metrics():
+    """
+    Latency histograms (milliseconds) with query counts and database time,
+    per route and per GraphQL resolver
+    """
+    return get_metrics()
+
+
+@router.get('/pool', response_model=PoolMetricsModel)
+async def pool_metrics():
+    """
+    Connection pool usage since the app started
+    """
+    return get_pool_metrics()
+
+
+@router.get('/startup', response_model=StartupMetricsModel)
+async def startup_metrics():
+    """
+    Time this worker took to start, by step
+    """
+    return startup_profile.as_dict()
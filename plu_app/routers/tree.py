@@ -0,0 +1,66 @@
+from datetime import date
+from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_session
+from ..export import stream_export
+from ..item_tree import get_tree_index, subtree_items_select
+from ..models import ItemTreeModel
+from .export import ExportFormat, MEDIA_TYPES
+
+
+router = APIRouter(
+    prefix='/tree',
+    tags=['tree']
+)
+
+
+async def get_subtree(session: AsyncSession, kode: str) -> List[ItemTreeModel]:
+    index = get_tree_index()
+    await index.refresh(session)
+    root = index.get(kode)
+    if root is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            "Kategori dengan kode {!r} tidak ditemukan".format(kode)
+        )
+    return index.subtree(root)
+
+
+@router.get('', response_model=List[ItemTreeModel])
+async def get_trees(
+    root: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    List categories in TreePath order, only the subtree of Kode ``root``
+    when given
+    """
+    if root is not None:
+        return await get_subtree(session, root)
+
+    index = get_tree_index()
+    await index.refresh(session)
+    return index.trees
+
+
+@router.get('/{kode}/items')
+async def export_tree_items(
+    kode: str,
+    format: ExportFormat = ExportFormat.ndjson,
+    at: Optional[date] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Stream active items of a category and its subcategories with their
+    prices at date ``at`` (default today), e.g. to reprint an aisle's labels
+    """
+    trees = await get_subtree(session, kode)
+    return StreamingResponse(
+        stream_export(subtree_items_select(trees), format.value, at),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': 'attachment; filename="items.{}"'.format(format.value),
+        },
+    )
@@ -85,6 +85,11 @@ def main():
 
         progress.stop_task(table_task)
 
+    # periksa query utama aplikasi terhadap index yang ada di database,
+    # diimpor setelah schema.py ditulis karena advisor memakai schema.py
+    from .index_advisor import advise
+    advise(engine, progress.console)
+
 
 def write_schema(output, table: Table, class_mapping: Dict[Optional[str], Dict[str, str]], console):
     """
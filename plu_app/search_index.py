@@ -0,0 +1,359 @@
+"""
+Trigram index over Nama, Singkatan, Kode and KodePabrik of active items.
+
+Every word is indexed by its trigrams with a leading space, so ``" gu"``
+marks a word starting with ``gu``, and by its first letter as ``" g"``.  A
+query matches an item by the share of its trigrams the item has, which
+covers prefixes, words in any order and small typos without
+``LIKE '%...%'`` scans on the database.
+
+Items of a full load are indexed at once into Postings, sorted arrays of
+row numbers per trigram.  Items changed after that are kept in a small
+index of sets next to it until the next full load.
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .models import ItemModel
+
+
+WORD_RE = re.compile(r'\w+')
+
+# skor minimum, bagian trigram kata kunci yang harus ada pada barang
+MIN_SCORE = 0.5
+
+
+def words(text: str) -> List[str]:
+    return WORD_RE.findall(text.casefold())
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = ' ' + word
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def word_grams(word: str) -> Set[str]:
+    return trigrams(word) | {' ' + word[:1]}
+
+
+def query_grams(query: str) -> Set[str]:
+    grams: Set[str] = set()
+    for word in words(query):
+        # kata satu huruf dicari sebagai awalan kata
+        grams.update(trigrams(word) if len(word) > 1 else {' ' + word})
+    return grams
+
+
+def item_words(item: ItemModel) -> Set[str]:
+    found: Set[str] = set()
+    for text in (item.Nama, item.Singkatan):
+        if text:
+            found.update(words(text))
+    for code in (item.Kode, item.KodePabrik):
+        if code:
+            parts = words(code)
+            found.update(parts)
+            # kode juga dicari tanpa pemisah, misalnya A1-002 sebagai a1002
+            found.add(''.join(parts))
+    found.discard('')
+    return found
+
+
+def item_grams(item: Any) -> Set[str]:
+    """
+    trigrams of ``item``, an ItemModel or anything with its text fields
+    """
+    grams: Set[str] = set()
+    for word in item_words(item):
+        grams.update(word_grams(word))
+    return grams
+
+
+def item_codes(item: Any) -> Tuple[str, ...]:
+    return tuple(code.casefold() for code in (item.Kode, item.KodePabrik) if code)
+
+
+def contains(posting: Sequence[int], value: int) -> bool:
+    """
+    ``value`` is in the sorted ``posting``
+    """
+    index = bisect_left(posting, value)
+    return index < len(posting) and posting[index] == value
+
+
+class Postings:
+    """
+    Read-only trigram index of items numbered by row.  Each trigram has a
+    sorted run of row numbers in ``rows``, ``codes`` are sorted with the
+    row of each code in ``code_rows``
+    """
+
+    def __init__(
+        self,
+        item_ids: Sequence[int],
+        sizes: Sequence[int],
+        grams: Iterable[str],
+        offsets: Sequence[int],
+        rows: Sequence[int],
+        codes: Sequence[str],
+        code_rows: Sequence[int],
+    ) -> None:
+        # IDItem per baris, urut
+        self.item_ids = item_ids
+        # jumlah trigram per baris, 0 untuk barang yang tidak diindeks
+        self.sizes = sizes
+        self.grams: Dict[str, int] = {gram: number for number, gram in enumerate(grams)}
+        self.offsets = offsets
+        # slice memoryview tidak menyalin isi array
+        self.rows = memoryview(rows) if isinstance(rows, array) else rows
+        self.codes = codes
+        self.code_rows = code_rows
+        self.count = sum(1 for size in sizes if size)
+
+    @classmethod
+    def build(cls, items: Iterable[Any]) -> 'Postings':
+        items = sorted(items, key=lambda item: item.IDItem)
+        builder = PostingsBuilder()
+        for row, item in enumerate(items):
+            builder.add(row, item)
+        return cls(array('q', (item.IDItem for item in items)), *builder.arrays(len(items)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def find(self, item_id: int) -> Optional[int]:
+        """
+        row of ``item_id`` if it is indexed
+        """
+        row = bisect_left(self.item_ids, item_id)
+        if row < len(self.item_ids) and self.item_ids[row] == item_id and self.sizes[row]:
+            return row
+        return None
+
+    def get(self, gram: str) -> Sequence[int]:
+        number = self.grams.get(gram)
+        if number is None:
+            return ()
+        return self.rows[self.offsets[number]:self.offsets[number + 1]]
+
+    def find_code(self, code: str) -> Sequence[int]:
+        start = bisect_left(self.codes, code)
+        end = bisect_right(self.codes, code, start)
+        return self.code_rows[start:end]
+
+
+class PostingsBuilder:
+    """
+    Collects the trigrams and codes of items added in row order
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, array] = {}
+        self.sizes = array('i')
+        self.codes: List[Tuple[str, int]] = []
+
+    def add(self, row: int, item: Any) -> None:
+        grams = item_grams(item)
+        self.sizes.extend([0] * (row - len(self.sizes)))
+        self.sizes.append(len(grams))
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('i')
+            posting.append(row)
+        for code in set(item_codes(item)):
+            self.codes.append((code, row))
+
+    def arrays(self, count: int) -> Tuple[array, List[str], array, array, List[str], array]:
+        """
+        sizes, grams, offsets, rows, codes and code rows of ``count`` rows,
+        the arguments of Postings after ``item_ids``
+        """
+        sizes = self.sizes + array('i', [0] * (count - len(self.sizes)))
+        grams = sorted(self.postings)
+        offsets = array('q', [0])
+        rows = array('i')
+        for gram in grams:
+            rows.extend(self.postings[gram])
+            offsets.append(len(rows))
+        self.codes.sort()
+        codes = [code for code, _ in self.codes]
+        code_rows = array('i', (row for _, row in self.codes))
+        return sizes, grams, offsets, rows, codes, code_rows
+
+
+def intersect(postings: List[Sequence[int]]) -> Set[int]:
+    """
+    rows in every posting, ``postings`` shortest first
+    """
+    found = set(postings[0])
+    for posting in postings[1:]:
+        if not found:
+            break
+        if len(found) * 16 < len(posting):
+            # posting jauh lebih panjang, dicari per baris
+            found = {row for row in found if contains(posting, row)}
+        else:
+            found.intersection_update(posting)
+    return found
+
+
+class SearchIndex:
+    """
+    Postings of the last full load, plus an inverted index from trigram to
+    IDItem of the items changed since, updated per item
+    """
+
+    def __init__(self, base: Optional[Postings] = None) -> None:
+        self.base = base if base is not None else Postings.build(())
+        # baris base milik barang yang sudah berubah atau dihapus
+        self.removed: Set[int] = set()
+        self.postings: Dict[str, Set[int]] = {}
+        self.grams: Dict[int, Set[str]] = {}
+        self.codes: Dict[int, Tuple[str, ...]] = {}
+        self.by_code: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.removed) + len(self.grams)
+
+    def put(self, item: ItemModel) -> None:
+        self.remove(item.IDItem)
+        grams = item_grams(item)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(item.IDItem)
+        self.grams[item.IDItem] = grams
+
+        codes = item_codes(item)
+        for code in codes:
+            self.by_code.setdefault(code, set()).add(item.IDItem)
+        self.codes[item.IDItem] = codes
+
+    def remove(self, item_id: int) -> None:
+        row = self.base.find(item_id)
+        if row is not None:
+            self.removed.add(row)
+        for gram in self.grams.pop(item_id, ()):
+            posting = self.postings[gram]
+            posting.discard(item_id)
+            if not posting:
+                del self.postings[gram]
+        for code in self.codes.pop(item_id, ()):
+            item_ids = self.by_code[code]
+            item_ids.discard(item_id)
+            if not item_ids:
+                del self.by_code[code]
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """
+        up to ``limit`` (IDItem, score) best matching ``query``, best first:
+        exact Kode or KodePabrik, then items having every trigram of the
+        query, then items having at least ``MIN_SCORE`` of them; shorter
+        items first on equal score
+        """
+        grams = query_grams(query)
+        if not grams or limit < 1:
+            return []
+        base = self.base
+
+        code = query.strip().casefold()
+        exact = set(self.by_code.get(code, ()))
+        exact.update(base.item_ids[row] for row in base.find_code(code) if row not in self.removed)
+        ranked: Dict[int, float] = dict.fromkeys(sorted(exact), 2.0)
+
+        postings = sorted((base.get(gram) for gram in grams), key=len)
+        changed = [self.postings.get(gram, set()) for gram in grams]
+
+        # (jumlah trigram, IDItem) dari base dan dari barang yang berubah
+        complete = [
+            (base.sizes[row], base.item_ids[row])
+            for row in heapq.nsmallest(
+                limit, sorted(intersect(postings) - self.removed), key=base.sizes.__getitem__
+            )
+        ]
+        complete.extend((len(self.grams[item_id]), item_id) for item_id in set.intersection(*changed))
+        for _, item_id in heapq.nsmallest(limit, complete):
+            ranked.setdefault(item_id, 1.0)
+
+        if len(ranked) < limit:
+            required = math.ceil(len(grams) * MIN_SCORE)
+            hits, threshold = self._count_hits(postings, required, limit - len(ranked))
+            partial = [
+                (hits[row] / len(grams), -base.sizes[row], -base.item_ids[row])
+                for row in compress(hits, map(threshold.__le__, hits.values()))
+                if hits[row] < len(grams) and row not in self.removed
+            ]
+            changed_hits: Counter = Counter()
+            for posting in changed:
+                changed_hits.update(posting)
+            partial.extend(
+                (count / len(grams), -len(self.grams[item_id]), -item_id)
+                for item_id, count in changed_hits.items()
+                if required <= count < len(grams)
+            )
+            for score, _, item_id in heapq.nlargest(limit, partial):
+                ranked.setdefault(-item_id, score)
+
+        return list(ranked.items())[:limit]
+
+    def _count_hits(self, postings: List[Sequence[int]], required: int, limit: int) -> Tuple[Dict[int, int], int]:
+        """
+        number of ``postings`` (shortest first) having each row, and the
+        count the ``limit`` best rows having ``required`` or more but not all
+        of them reach.  Rows are taken from the rarest postings first, as
+        long as that is cheaper than counting every posting
+        """
+        sets: Dict[int, Set[int]] = {}
+
+        def posting_set(number: int) -> Set[int]:
+            if number not in sets:
+                sets[number] = set(postings[number])
+            return sets[number]
+
+        hits: Dict[int, int] = {}
+        # jumlah baris per jumlah trigram
+        histogram: Counter = Counter()
+
+        def found(threshold: int) -> int:
+            return sum(histogram[count] for count in range(threshold, len(postings))) - sum(
+                1 for row in self.removed if threshold <= hits.get(row, 0) < len(postings)
+            )
+
+        total = sum(len(posting) for posting in postings)
+        for rare in range(1, len(postings) - required + 2):
+            rows = posting_set(rare - 1).difference(hits)
+            # tiap baris baru dicari di semua posting, beberapa kali lebih
+            # lambat per baris daripada menghitung posting seluruhnya
+            if len(rows) * len(postings) * 4 > total:
+                counter: Counter = Counter()
+                for posting in postings:
+                    counter.update(posting)
+                hits = counter
+                histogram = Counter(hits.values())
+                break
+
+            new_hits: Counter = Counter()
+            for number, posting in enumerate(postings):
+                if len(rows) * 16 < len(posting):
+                    new_hits.update([row for row in rows if contains(posting, row)])
+                else:
+                    new_hits.update(rows & posting_set(number))
+            # baris baru belum ada di hits
+            hits.update(new_hits)
+            histogram.update(new_hits.values())
+
+            # baris dengan `threshold` trigram atau lebih pasti ada di salah
+            # satu dari `rare` posting paling jarang
+            threshold = len(postings) - rare + 1
+            if found(threshold) >= limit:
+                return hits, threshold
+
+        for threshold in range(len(postings) - 1, required, -1):
+            if found(threshold) >= limit:
+                return hits, threshold
+        return hits, required
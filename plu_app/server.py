@@ -0,0 +1,171 @@
+"""
+Multi worker server for production
+
+    plu_app --bind 0.0.0.0:80 --workers 2
+
+Runs gunicorn with uvicorn workers when gunicorn is installed, uvicorn's
+own worker supervisor otherwise.  Every worker warms up (database pool,
+price cache, category tree) before it accepts connections, see
+``main.warm_up``.
+
+With several workers the price cache is kept in one memory mapped store
+file in the run folder, unless ``catalog_store_path`` is configured.
+
+SIGHUP restarts the workers with the current code and ``.env``.  Under
+gunicorn the old workers keep serving until their replacements are warm,
+so a reload at store opening does not slow the scanners down.
+"""
+import argparse
+import os
+import shutil
+import signal
+import tempfile
+from typing import Any, Dict, List, Optional, Set
+
+
+APP = 'plu_app.main:app'
+
+# folder tempat worker menandai dirinya siap, diisi oleh server
+READY_DIR_ENV = 'PLU_APP_READY_DIR'
+CATALOG_STORE_ENV = 'CATALOG_STORE_PATH'
+
+
+def mark_worker_ready() -> None:
+    """
+    Called by a worker once its startup events are done
+    """
+    ready_dir = os.environ.get(READY_DIR_ENV)
+    if ready_dir and os.path.isdir(ready_dir):
+        with open(os.path.join(ready_dir, str(os.getpid())), 'w'):
+            pass
+
+
+def ready_pids(ready_dir: str) -> List[int]:
+    return [int(name) for name in os.listdir(ready_dir) if name.isdigit()]
+
+
+def share_catalog_store(workers: int, run_dir: str) -> None:
+    """
+    Point the workers at one store file in ``run_dir``, see
+    ``price_cache.load_shared_store``
+    """
+    from .settings import Settings
+    # bukan get_settings, agar worker hasil fork tidak mewarisi nilai lama
+    if workers > 1 and not Settings().catalog_store_path:
+        os.environ[CATALOG_STORE_ENV] = os.path.join(run_dir, 'catalog.bin')
+
+
+def run_gunicorn(args: argparse.Namespace, ready_dir: str) -> None:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.arbiter import Arbiter
+
+    class RollingArbiter(Arbiter):
+        """
+        Stops workers beyond ``workers`` only as their replacements become
+        ready, instead of right after spawning them
+        """
+
+        def __init__(self, app: BaseApplication) -> None:
+            super().__init__(app)
+            # uvicorn berhenti paksa pada SIGTERM kedua
+            self.stopping: Set[int] = set()
+
+        def manage_workers(self) -> None:
+            ready = set(ready_pids(ready_dir))
+            for pid in ready - set(self.WORKERS):
+                os.remove(os.path.join(ready_dir, str(pid)))
+            self.stopping &= set(self.WORKERS)
+
+            workers = sorted(
+                (worker for worker in self.WORKERS.items() if worker[0] not in self.stopping),
+                key=lambda worker: worker[1].age,
+            )
+            if len(workers) < self.num_workers:
+                self.spawn_workers()
+                return
+
+            newest = [pid for pid, _ in workers[-self.num_workers:]]
+            replaced = min(len(workers) - self.num_workers, len(ready.intersection(newest)))
+            for pid, _ in workers[:replaced]:
+                self.stopping.add(pid)
+                self.kill_worker(pid, signal.SIGTERM)
+
+    class Application(BaseApplication):
+
+        def __init__(self, options: Dict[str, Any]) -> None:
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from .main import app
+            return app
+
+        def run(self) -> None:
+            RollingArbiter(self).run()
+
+    Application({
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        # worker belum mengirim heartbeat selama warm up
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'proc_name': 'plu_app',
+    }).run()
+
+
+def run_uvicorn(args: argparse.Namespace) -> None:
+    """
+    SIGHUP restarts the workers one at a time, without waiting for them
+    to be ready
+    """
+    import uvicorn
+
+    host, _, port = args.bind.rpartition(':')
+    uvicorn.run(
+        APP,
+        host=host or '0.0.0.0',
+        port=int(port),
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+
+def has_gunicorn() -> bool:
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Run the PLU app with several workers')
+    parser.add_argument('--bind', default='0.0.0.0:8000', help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument(
+        '--timeout', type=int, default=300,
+        help='seconds a worker may take to start or stay silent, must cover the price cache load',
+    )
+    parser.add_argument('--graceful-timeout', type=int, default=30, help='seconds to finish requests on stop')
+    parser.add_argument('--no-gunicorn', dest='gunicorn', action='store_false', help='use uvicorn workers only')
+    args = parser.parse_args(argv)
+
+    run_dir = tempfile.mkdtemp(prefix='plu_app-')
+    try:
+        share_catalog_store(args.workers, run_dir)
+        if args.gunicorn and has_gunicorn():
+            os.environ[READY_DIR_ENV] = run_dir
+            run_gunicorn(args, run_dir)
+        else:
+            run_uvicorn(args)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
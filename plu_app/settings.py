@@ -1,11 +1,12 @@
 from functools import lru_cache
 from os import getenv
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-from cryptography.fernet import Fernet
 from pydantic import BaseSettings
-from sqlalchemy.engine import URL
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import URL
 
 
 class Settings(BaseSettings):
@@ -16,20 +17,52 @@ class Settings(BaseSettings):
     db_user: str = 'user'
     db_password: Optional[str] = None
 
+    # connection pool, recycle must be lower than MySQL wait_timeout
+    db_pool_size: int = 5
+    db_pool_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 3600
+    db_pool_pre_ping: bool = True
+
     log_file: str = str(Path(__file__).parent / '.plu_app.log')
 
     app_title: str = 'Cek Harga'
     app_subtitle: str = ''
 
+    price_cache_enabled: bool = True
+    price_cache_poll_seconds: float = 10.0
+    price_cache_full_refresh_seconds: int = 3600
+    # file snapshot harga yang dibagi antar worker, jika diisi
+    catalog_store_path: Optional[str] = None
+    # simpan JSON PLU yang sudah dikodekan per barang
+    price_cache_json: bool = True
+    # jumlah PLU terakhir dipakai yang disimpan sudah dirakit
+    price_cache_plu_size: int = 20000
+    # buka koneksi dan muat cache sebelum worker menerima request
+    startup_warm_up: bool = True
+
+    plu_batch_max_codes: int = 5000
+    search_max_results: int = 50
+    item_tree_cache_seconds: int = 300
+
+    # file SQLite replika lokal, jika diisi aplikasi membaca dari replika
+    replica_path: Optional[str] = None
+    replica_sync_seconds: float = 30.0
+    replica_full_sync_seconds: int = 86400
+
     class Config:
         env_file = str(Path(__file__).parent / '.env')
 
     def save(self) -> None:
         with open(self.Config.env_file, 'wt') as out:
             for key, value in self.dict().items():
+                # None akan terbaca kembali sebagai string 'None'
+                if value is None:
+                    continue
                 out.write('{}={!r}\n'.format(key.upper(), value))
 
     def generate_secret_key(self):
+        from cryptography.fernet import Fernet
         self.secret_key = Fernet.generate_key().decode('utf-8')
 
     def get_password(self) -> str:
@@ -37,16 +70,19 @@ class Settings(BaseSettings):
             raise Exception('Secret key is not generated')
         if self.db_password is None:
             raise Exception('DB Password is not configured')
+        from cryptography.fernet import Fernet
         fernet = Fernet(self.secret_key.encode('utf-8'))
         return fernet.decrypt(self.db_password.encode('utf-8')).decode('utf-8')
 
     def set_password(self, password: str) -> None:
         if self.secret_key is None:
             raise Exception('Secret is not generated')
+        from cryptography.fernet import Fernet
         fernet = Fernet(self.secret_key.encode('utf-8'))
         self.db_password = fernet.encrypt(password.encode('utf-8')).decode('utf-8')
 
-    def get_db_url(self) -> URL:
+    def get_db_url(self) -> 'URL':
+        from sqlalchemy.engine import URL
         password = self.get_password()
         return URL.create(
             drivername='mysql+pymysql',
@@ -57,6 +93,13 @@ class Settings(BaseSettings):
             database=self.db_database,
         )
 
+    def get_async_db_url(self) -> 'URL':
+        return self.get_db_url().set(drivername='mysql+aiomysql')
+
+    def get_replica_url(self) -> 'URL':
+        from sqlalchemy.engine import URL
+        return URL.create(drivername='sqlite+aiosqlite', database=self.replica_path)
+
 
 @lru_cache()
 def get_settings() -> Settings:
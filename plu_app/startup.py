@@ -0,0 +1,110 @@
+"""
+Startup profiling.
+
+Every worker records how long importing the app and each warm up step
+took, logs it once it is ready and serves it at ``/metrics/startup``.
+To see which imports make ``plu_app.main`` slow to import, run
+
+    python -m plu_app.startup
+"""
+import argparse
+import logging
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Tuple, Iterator, Any
+
+
+logger = logging.getLogger('plu_app.startup')
+
+
+class StartupProfile:
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        logger.info('started in %.2fs: %s', self.ready_at - self.started, ', '.join(
+            '{} {:.2f}s'.format(name, seconds) for name, seconds in self.steps.items()
+        ))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'seconds': None if self.ready_at is None else self.ready_at - self.started,
+            'steps': self.steps,
+        }
+
+
+startup_profile = StartupProfile()
+
+
+def import_times(module: str) -> List[Tuple[str, int, int]]:
+    """
+    (module, self, cumulative) microseconds of every module imported by a
+    fresh interpreter importing ``module``
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def group_name(module: str) -> str:
+    """
+    modules of the app by themselves, other packages as a whole
+    """
+    if module.startswith('plu_app.') or module == 'plu_app':
+        return module
+    return module.split('.')[0]
+
+
+def main():
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description='Report what makes importing the app slow')
+    parser.add_argument('--module', default='plu_app.main')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    times = import_times(args.module)
+    grouped: Dict[str, int] = {}
+    for name, self_us, _ in times:
+        grouped[group_name(name)] = grouped.get(group_name(name), 0) + self_us
+    total = next(cumulative for name, _, cumulative in times if name == args.module)
+
+    table = Table(title='import {} took {:.0f} ms'.format(args.module, total / 1000))
+    table.add_column('module / package')
+    table.add_column('ms', justify='right')
+    table.add_column('%', justify='right')
+    for name, self_us in sorted(grouped.items(), key=lambda item: -item[1])[:args.top]:
+        table.add_row(name, '{:.1f}'.format(self_us / 1000), '{:.0f}'.format(self_us * 100 / total))
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
+from functools import lru_cache
 from pathlib import Path
 
 
+@lru_cache()
 def get_version() -> str:
     version_file = Path(__file__).parent / 'VERSION.txt'
     with version_file.open('rt') as f:
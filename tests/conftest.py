@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from plu_app import db
+from plu_app.schema import metadata
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """
+    SQLite database with the app schema used by the app instead of MySQL,
+    yields a session to fill it
+    """
+    pytest.importorskip('aiosqlite')
+    path = tmp_path / 'plu.db'
+    engine = create_engine('sqlite:///{}'.format(path))
+    metadata.create_all(engine)
+
+    # tanpa pool, TestClient menjalankan setiap request di event loop sendiri
+    async_engine = create_async_engine('sqlite+aiosqlite:///{}'.format(path), poolclass=NullPool)
+    monkeypatch.setattr(db, 'get_engine', lambda: async_engine)
+    db.get_sessionmaker.cache_clear()
+    with Session(engine) as session:
+        yield session
+    db.get_sessionmaker.cache_clear()
+    engine.dispose()
@@ -0,0 +1,44 @@
+from plu_app.barcode import gtin_check_digit, is_valid_gtin, normalize_barcode, barcode_variants
+
+
+def test_gtin_check_digit():
+    assert gtin_check_digit('03600029145') == 2
+    assert gtin_check_digit('899722789129') == 5
+    assert gtin_check_digit('9638507') == 4
+
+
+def test_is_valid_gtin():
+    assert is_valid_gtin('036000291452')
+    assert is_valid_gtin('36000291452')
+    assert is_valid_gtin('8997227891295')
+    assert is_valid_gtin('96385074')
+    assert not is_valid_gtin('8997227891294')
+    assert not is_valid_gtin('90005010')
+    assert not is_valid_gtin('899722789129A')
+    assert not is_valid_gtin('36000291453')
+    assert not is_valid_gtin('123')
+    assert not is_valid_gtin('6000291452')
+
+
+def test_normalize_barcode():
+    # UPC-A, EAN-13 dan GTIN-14 dari produk yang sama
+    assert normalize_barcode('036000291452') == '00036000291452'
+    assert normalize_barcode('36000291452') == '00036000291452'
+    assert normalize_barcode('0036000291452') == '00036000291452'
+    assert normalize_barcode('00036000291452') == '00036000291452'
+    assert normalize_barcode(' 8997227891295 ') == '08997227891295'
+    # GTIN-14 kemasan dus bukan produk satuannya
+    assert normalize_barcode('10036000291459') == '10036000291459'
+    assert normalize_barcode('A1') is None
+    assert normalize_barcode(None) is None
+
+
+def test_barcode_variants():
+    assert barcode_variants('036000291452') == [
+        '36000291452', '036000291452', '0036000291452', '00036000291452',
+    ]
+    assert barcode_variants('36000291452') == barcode_variants('036000291452')
+    assert barcode_variants('96385074') == [
+        '96385074', '00096385074', '000096385074', '0000096385074', '00000096385074',
+    ]
+    assert barcode_variants('8997227891294') == []
@@ -0,0 +1,166 @@
+import json
+import math
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from plu_app.catalog_store import MAGIC, HEADER_LENGTH, NO_STRING, CatalogBuilder, CatalogStore
+from plu_app.models import YaTidakEnum, ItemModel
+from plu_app.search_index import Postings, SearchIndex
+
+
+def item(item_id: int, kode: str, aktif: str = 'Ya', **values) -> SimpleNamespace:
+    fields = dict(
+        IDItem=item_id, Aktif=aktif, Kode=kode, Nama='Barang ' + kode, Singkatan=None, Barcode=None,
+        KodePabrik=None, JumlahDos=1.0, Satuan='PCS', HargaNormal=1000.0, HargaJual=900.0,
+    )
+    fields.update(values)
+    return SimpleNamespace(**fields)
+
+
+def grosir(grosir_id: int, item_id: int, jumlah: float, harga: float, is_dos: str = 'Tidak') -> SimpleNamespace:
+    return SimpleNamespace(IDItemHargaGrosir=grosir_id, IDItem=item_id, Jumlah=jumlah, Harga=harga, IsDos=is_dos)
+
+
+def build() -> CatalogStore:
+    builder = CatalogBuilder()
+    # sengaja tidak urut, builder mengurutkan per IDItem
+    builder.add_item(item(30, 'B030', Barcode='8990000000303', JumlahDos=None, HargaJual=None))
+    builder.add_item(item(10, 'B010', Barcode='8990000000010'))
+    builder.add_item(item(20, 'B020', aktif='Tidak', KodePabrik='F020'))
+    builder.add_grosir(grosir(3, 10, 12, 800, 'Ya'))
+    builder.add_grosir(grosir(1, 30, 6, 850))
+    builder.add_grosir(grosir(2, 10, 3, 880))
+    return builder.build({'item_watermark': '2026-01-01 00:00:00'})
+
+
+def test_layout():
+    store = build()
+    buffer = store.buffer
+    assert buffer[:len(MAGIC)] == MAGIC
+    header_length, = HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+    header_start = len(MAGIC) + HEADER_LENGTH.size
+    header = json.loads(buffer[header_start:header_start + header_length])
+    assert header['meta'] == store.meta == {'item_watermark': '2026-01-01 00:00:00'}
+    for name, (offset, length, typecode) in header['sections'].items():
+        # setiap kolom dimulai di batas 8 byte
+        assert offset % 8 == 0
+        assert len(store.columns[name]) * struct.calcsize(typecode) == length
+    assert list(store.item_ids) == [10, 20, 30]
+    assert list(store.grosir_item_ids) == [10, 10, 30]
+    assert list(store.columns['item.Aktif']) == [1, 0, 1]
+
+
+def test_strings_are_interned():
+    builder = CatalogBuilder()
+    builder.add_item(item(1, 'A'))
+    builder.add_item(item(2, 'B'))
+    # Satuan 'PCS' hanya disimpan sekali
+    assert list(builder.strings).count('PCS') == 1
+    assert builder.intern(None) == NO_STRING
+    store = builder.build()
+    assert store.columns['item.Satuan'][0] == store.columns['item.Satuan'][1]
+    assert store.columns['item.Singkatan'][0] == NO_STRING
+    assert store.string(NO_STRING) is None
+
+
+def test_round_trip_through_file(tmp_path):
+    path = str(tmp_path / 'catalog.bin')
+    build().save(path)
+    store = CatalogStore.open(path)
+    assert len(store) == 3
+    assert store.meta['item_watermark'] == '2026-01-01 00:00:00'
+
+    first = store.get_item(10)
+    assert isinstance(first, ItemModel)
+    assert first.dict() == {
+        'IDItem': 10, 'Kode': 'B010', 'Nama': 'Barang B010', 'Singkatan': None, 'Barcode': '8990000000010',
+        'KodePabrik': None, 'JumlahDos': 1.0, 'Satuan': 'PCS', 'HargaNormal': 1000.0, 'HargaJual': 900.0,
+    }
+    # None disimpan sebagai NaN di kolom angka
+    assert math.isnan(store.columns['item.HargaJual'][store.find(30)])
+    last = store.get_item(30)
+    assert last.JumlahDos is None
+    assert last.HargaJual is None
+
+
+def test_find_key():
+    store = build()
+    assert store.find_key('kode', 'B010') == [0]
+    # barang tidak aktif juga dicatat
+    assert store.find_key('kode', 'B020') == [1]
+    assert store.find_key('barcode', '8990000000303') == [2]
+    assert store.find_key('gtin', '08990000000303') == [2]
+    # barcode dengan check digit salah tidak punya bentuk GTIN
+    assert store.find_key('barcode', '8990000000010') == [0]
+    assert store.find_key('gtin', '08990000000010') == []
+    assert store.find_key('kode', 'B015') == []
+    assert store.find_key('kode', 'B999') == []
+    assert store.find_key('barcode', '') == []
+
+    builder = CatalogBuilder()
+    builder.add_item(item(2, 'B', Barcode='111'))
+    builder.add_item(item(1, 'A', Barcode='111'))
+    builder.add_item(item(3, 'C', Barcode=''))
+    store = builder.build()
+    assert store.find_key('barcode', '111') == [0, 1]
+    assert store.find_key('barcode', '') == []
+
+
+def test_inactive_and_missing_items():
+    store = build()
+    assert store.find(20) == 1
+    assert not store.is_active(1)
+    assert store.get_item(20) is None
+    assert store.item_at(1).Kode == 'B020'
+    assert store.find(15) is None
+    assert store.find(40) is None
+    assert store.get_item(15) is None
+    assert [model.IDItem for model in store.items()] == [10, 30]
+
+
+def test_get_grosirs():
+    store = build()
+    tiers = store.get_grosirs(10)
+    assert [(tier.IDItemHargaGrosir, tier.Jumlah, tier.Harga) for tier in tiers] == [(2, 3, 880), (3, 12, 800)]
+    assert [tier.IsDos for tier in tiers] == [YaTidakEnum.tidak, YaTidakEnum.ya]
+    assert all(tier.IDItem == 10 for tier in tiers)
+    assert [tier.IDItemHargaGrosir for tier in store.get_grosirs(30)] == [1]
+    assert store.get_grosirs(20) == []
+    assert store.get_grosirs(5) == []
+    assert store.get_grosirs(99) == []
+
+
+def test_empty():
+    store = CatalogStore.empty()
+    assert len(store) == 0
+    assert store.get_item(1) is None
+    assert store.get_grosirs(1) == []
+    assert list(store.items()) == []
+
+
+def test_search_postings(tmp_path):
+    path = str(tmp_path / 'catalog.bin')
+    build().save(path)
+    store = CatalogStore.open(path)
+    postings = store.postings()
+    assert len(postings) == 2
+    # barang tidak aktif tidak diindeks
+    assert postings.find(20) is None
+    assert list(postings.find_code('f020')) == []
+    assert list(postings.find_code('b030')) == [2]
+
+    index = SearchIndex(postings)
+    expected = SearchIndex(Postings.build(store.items()))
+    for query in ('b010', 'B030', 'barang', 'barang b0', 'b020', 'f020', 'pcs'):
+        assert index.search(query, 10) == expected.search(query, 10)
+    assert index.search('b010', 10)[0] == (10, 2.0)
+    assert index.search('b020', 10) == []
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / 'catalog.bin'
+    path.write_bytes(b'PLUCAT1\n' + bytes(64))
+    with pytest.raises(ValueError):
+        CatalogStore.open(str(path))
@@ -0,0 +1,21 @@
+import json
+from datetime import date
+
+from plu_app.encoding import encode_plu
+from plu_app.models import ItemModel, ItemHargaGrosirModel, ItemHargaPromoModel, PluModel
+
+
+def test_encode_plu():
+    plu = PluModel(
+        item=ItemModel(IDItem=1, Kode='A1', Nama='Kopi "Bubuk" ½ kg', HargaNormal=10, HargaJual=9),
+        hargaGrosir=[
+            ItemHargaGrosirModel(IDItemHargaGrosir=1, IDItem=1, Jumlah=10, Harga=8, IsDos='Tidak'),
+        ],
+        hargaPromo=[
+            ItemHargaPromoModel(
+                IDItemHargaD=1, IDItemHargaH=1, IDItem=1, Kode='P1', Nama='Promo',
+                TanggalAwal=date(2026, 10, 1), TanggalAkhir=date(2026, 10, 31), HargaJual=7,
+            ),
+        ],
+    )
+    assert json.loads(encode_plu(plu)) == json.loads(plu.json())
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from plu_app.main import app
+from plu_app.schema import Item, ItemHargaGrosir
+
+
+def seed(session) -> None:
+    session.add_all([
+        Item(IDItem=1, Kode='A1', Barcode='111', Nama='Satu', HargaNormal=10, HargaJual=9, Aktif='Ya',
+             InsertTime=datetime(2026, 1, 1), UpdateTime=datetime(2026, 3, 1, 8)),
+        Item(IDItem=2, Kode='A2', Barcode='222', Nama='Dua', HargaNormal=20, HargaJual=19, Aktif='Ya',
+             InsertTime=datetime(2026, 1, 1)),
+        Item(IDItem=3, Kode='A3', Barcode='333', Nama='Tiga', HargaNormal=30, HargaJual=29, Aktif='Tidak',
+             InsertTime=datetime(2026, 1, 1), UpdateTime=datetime(2026, 3, 2)),
+        ItemHargaGrosir(IDItemHargaGrosir=1, IDItem=1, Jumlah=5, Harga=8.5, IsDos='Tidak', Aktif='Ya'),
+    ])
+    session.commit()
+
+
+def test_changes_since(database):
+    seed(database)
+    client = TestClient(app)
+
+    response = client.get('/export/changes', params={'since': '2026-02-01T00:00:00'})
+    assert response.status_code == 200
+    changes = response.json()
+    assert [plu['item']['IDItem'] for plu in changes['items']] == [1]
+    assert [tier['Harga'] for tier in changes['items'][0]['hargaGrosir']] == [8.5]
+    assert changes['removed'] == [3]
+    # watermark paling tidak awal hari ini
+    assert changes['watermark'] >= datetime.combine(date.today(), datetime.min.time()).isoformat()
+
+    response = client.get('/export/changes', params={'since': changes['watermark']})
+    assert response.status_code == 200
+    assert response.json()['items'] == []
+
+
+def test_changes_since_with_offset(database):
+    seed(database)
+    client = TestClient(app)
+
+    # waktu dengan zona dibaca sebagai waktu lokal yang sama
+    local = datetime(2026, 3, 1, 8).astimezone()
+    for since, item_ids in [(local, [1]), (local + timedelta(seconds=1), [])]:
+        response = client.get('/export/changes', params={'since': since.isoformat()})
+        assert response.status_code == 200
+        assert [plu['item']['IDItem'] for plu in response.json()['items']] == item_ids
+
+    response = client.get('/export/changes', params={'since': '2024-01-01T00:00:00Z'})
+    assert response.status_code == 200
+    assert [plu['item']['IDItem'] for plu in response.json()['items']] == [1, 2]
+    assert response.json()['removed'] == [3]
+
+    since = datetime(2026, 3, 1, 8, tzinfo=timezone.utc)
+    response = client.get('/export/changes', params={'since': since.isoformat()})
+    assert response.status_code == 200
@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+import strawberry
+
+from plu_app.graphql.extensions import ResolverTiming, StaticResultCache
+from plu_app.instrumentation import resolver_histograms
+
+
+@strawberry.type
+class Row:
+    name: str
+
+    @strawberry.field
+    async def price(self) -> float:
+        return 1.5
+
+
+calls = []
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    def rows(self) -> List[Row]:
+        return [Row(name='row{}'.format(number)) for number in range(3)]
+
+    @strawberry.field
+    async def row(self) -> Row:
+        return Row(name='async')
+
+    @strawberry.field(extensions=[StaticResultCache()])
+    def version(self) -> str:
+        calls.append(1)
+        return '1.0'
+
+
+schema = strawberry.Schema(query=Query, extensions=[ResolverTiming])
+
+
+def count(key: str) -> int:
+    return resolver_histograms.as_dict().get(key, {}).get('count', 0)
+
+
+def test_sync_fields_stay_synchronous():
+    rows = count('Query.rows')
+    # gagal jika ada resolver yang menjadi coroutine
+    result = schema.execute_sync('{ rows { name } version }')
+    assert result.errors is None
+    assert result.data == {'rows': [{'name': 'row0'}, {'name': 'row1'}, {'name': 'row2'}], 'version': '1.0'}
+    # field root tetap dicatat, atribut biasa tidak
+    assert count('Query.rows') == rows + 1
+    assert 'Row.name' not in resolver_histograms.as_dict()
+
+    schema.execute_sync('{ version }')
+    assert len(calls) == 1
+
+
+def test_async_fields_are_timed():
+    row, price = count('Query.row'), count('Row.price')
+    result = asyncio.run(schema.execute('{ row { name price } rows { price } }'))
+    assert result.errors is None
+    assert result.data['row'] == {'name': 'async', 'price': 1.5}
+    assert count('Query.row') == row + 1
+    assert count('Row.price') == price + 4
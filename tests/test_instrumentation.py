@@ -0,0 +1,45 @@
+import re
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from plu_app import db
+from plu_app.instrumentation import BUCKETS_MS, Histogram, instrument_engine
+from plu_app.main import app
+from plu_app.schema import Item
+
+
+def test_histogram():
+    histogram = Histogram()
+    for ms in (0.5, 1, 7, 10000):
+        histogram.observe(ms, queries=2, db_ms=0.25)
+    metrics = histogram.as_dict()
+    assert (metrics['count'], metrics['sum_ms'], metrics['queries'], metrics['db_ms']) == (4, 10008.5, 8, 1.0)
+    # batas bucket ikut bucket itu sendiri
+    assert metrics['buckets']['le_1'] == 2
+    assert metrics['buckets']['le_10'] == 1
+    assert metrics['buckets']['le_inf'] == 1
+    assert len(metrics['buckets']) == len(BUCKETS_MS) + 1
+
+
+def test_server_timing(database):
+    database.add(Item(IDItem=1, Kode='A1', Nama='Satu', HargaNormal=1000, Aktif='Ya', InsertTime=datetime(2026, 1, 1)))
+    database.commit()
+    instrument_engine(db.get_engine().sync_engine)
+    client = TestClient(app)
+
+    response = client.get('/item', params={'code': 'A1'})
+    assert response.status_code == 200
+    timing = re.fullmatch(
+        r'db;dur=([\d.]+);desc="(\d+) queries", pool;dur=[\d.]+, app;dur=([\d.]+)',
+        response.headers['Server-Timing'],
+    )
+    assert timing is not None, response.headers['Server-Timing']
+    assert int(timing.group(2)) > 0
+    assert float(timing.group(1)) <= float(timing.group(3))
+
+    routes = client.get('/metrics').json()['routes']
+    assert routes['GET /item']['count'] >= 1
+    assert routes['GET /item']['queries'] >= int(timing.group(2))
+    # request ke /metrics sendiri juga tercatat
+    assert 'Server-Timing' in client.get('/metrics').headers
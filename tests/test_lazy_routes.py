@@ -0,0 +1,47 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from plu_app.lazy_routes import LazyRoutes, add_lazy_routes, load_lazy_routes
+from plu_app.main import app
+from plu_app.settings import get_settings
+from plu_app.startup import startup_profile
+
+
+def lazy_routes(app: FastAPI) -> list:
+    return [route.module for route in app.router.routes if isinstance(route, LazyRoutes)]
+
+
+def test_loaded_on_first_request(database):
+    lazy_app = FastAPI()
+    add_lazy_routes(lazy_app, '/tree', 'plu_app.routers.tree')
+    add_lazy_routes(lazy_app, '/metrics', 'plu_app.routers.metrics')
+    assert lazy_routes(lazy_app) == ['plu_app.routers.tree', 'plu_app.routers.metrics']
+    client = TestClient(lazy_app)
+
+    # /treex bukan bagian dari /tree
+    assert client.get('/treex').status_code == 404
+    assert lazy_routes(lazy_app) == ['plu_app.routers.tree', 'plu_app.routers.metrics']
+
+    assert client.get('/tree').status_code == 200
+    assert lazy_routes(lazy_app) == ['plu_app.routers.metrics']
+    # route router menggantikan placeholder di tempat yang sama
+    assert lazy_app.router.routes[-1].module == 'plu_app.routers.metrics'
+    assert client.get('/tree/NOPE/items').status_code == 404
+    assert 'load plu_app.routers.tree' in startup_profile.steps
+
+    load_lazy_routes(lazy_app)
+    assert lazy_routes(lazy_app) == []
+    assert client.get('/metrics/startup').status_code == 200
+
+
+def test_openapi_lists_lazy_routes():
+    paths = TestClient(app).get('/openapi.json').json()['paths']
+    assert {'/item', '/item/batch', '/graphql', '/metrics/startup', '/tree', '/export/changes'} <= set(paths)
+
+
+def test_startup_metrics(database, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'price_cache_enabled', False)
+    with TestClient(app) as client:
+        metrics = client.get('/metrics/startup').json()
+    assert metrics['seconds'] is not None
+    assert metrics['steps']['import'] > 0
@@ -0,0 +1,199 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from plu_app.lookup import inactive_message, item_id_select, not_found_message
+from plu_app.main import app
+from plu_app.price_cache import get_price_cache, refresh_price_cache
+from plu_app.schema import Item, ItemHarga, ItemHargaD, ItemHargaGrosir
+from plu_app.settings import get_settings
+
+
+INSERTED = datetime(2026, 1, 1)
+
+
+def item(item_id: int, kode: str, nama: str, **values) -> Item:
+    fields = dict(HargaNormal=1000, HargaJual=900, Aktif='Ya', InsertTime=INSERTED)
+    fields.update(values)
+    return Item(IDItem=item_id, Kode=kode, Nama=nama, **fields)
+
+
+def seed(session) -> None:
+    today = date.today()
+    session.add_all([
+        item(1, 'A1-002', 'Kopi Bubuk Kapal Api 165g', Barcode='8990000000105'),
+        item(2, 'A1-003', 'Kopi Susu Sachet', Barcode='8990000000204', Singkatan='KSS'),
+        item(3, 'B2-001', 'Gula Pasir 1kg', KodePabrik='GP_001'),
+        item(4, 'KOPI', 'Teh Celup Kotak'),
+        item(5, 'C3-001', 'Kopi Susu Gula Aren Kemasan Botol 250ml', Aktif='Tidak'),
+        item(6, 'D4-001', 'Sabun Cair 400ml', Barcode='036000291452'),
+        # kode yang sama dengan barcode barang lain
+        item(7, '8990000000105', 'Kode Seperti Barcode'),
+        item(8, '36000291452', 'Kode Seperti UPC'),
+        ItemHargaGrosir(IDItemHargaGrosir=1, IDItem=2, Jumlah=10, Harga=850, IsDos='Tidak', Aktif='Ya'),
+        ItemHarga(
+            IDItemHargaH=1, Kode='P1', Nama='Promo', TanggalAwal=today, TanggalAkhir=today + timedelta(3),
+            Aktif='Ya', InsertTime=INSERTED,
+        ),
+        ItemHargaD(IDItemHargaD=1, IDItemHargaH=1, IDItem=2, HargaJual=800, DiskonPersen=0, Diskon=100),
+        # promo yang sudah lewat dan yang belum mulai
+        ItemHarga(
+            IDItemHargaH=2, Kode='P0', Nama='Promo Lalu', TanggalAwal=today - timedelta(5),
+            TanggalAkhir=today - timedelta(1), Aktif='Ya', InsertTime=INSERTED,
+        ),
+        ItemHargaD(IDItemHargaD=2, IDItemHargaH=2, IDItem=1, HargaJual=600, DiskonPersen=0, Diskon=0),
+        ItemHarga(
+            IDItemHargaH=3, Kode='P2', Nama='Promo Nanti', TanggalAwal=today + timedelta(10),
+            TanggalAkhir=today + timedelta(12), Aktif='Ya', InsertTime=INSERTED,
+        ),
+        ItemHargaD(IDItemHargaD=3, IDItemHargaH=3, IDItem=1, HargaJual=0, DiskonPersen=0, Diskon=300),
+    ])
+    session.commit()
+
+
+@contextmanager
+def price_cache_loaded():
+    asyncio.run(refresh_price_cache())
+    try:
+        yield get_price_cache()
+    finally:
+        get_price_cache.cache_clear()
+
+
+def kodes(plus) -> list:
+    return [plu['item']['Kode'] for plu in plus]
+
+
+def test_search_without_price_cache(database):
+    seed(database)
+    client = TestClient(app)
+
+    response = client.get('/item/search', params={'q': 'kopi'})
+    assert response.status_code == 200
+    # kode yang sama persis dulu, lalu nama yang lebih pendek
+    assert kodes(response.json()) == ['KOPI', 'A1-003', 'A1-002']
+
+    response = client.get('/item/search', params={'q': 'susu KOPI'})
+    plus = response.json()
+    assert kodes(plus) == ['A1-003']
+    assert [tier['Harga'] for tier in plus[0]['hargaGrosir']] == [850]
+    assert plus[0]['hargaEfektif'] == 800
+
+    assert kodes(client.get('/item/search', params={'q': 'kss'}).json()) == ['A1-003']
+    assert kodes(client.get('/item/search', params={'q': 'gp_001'}).json()) == ['B2-001']
+    # _ dan % bukan wildcard
+    assert kodes(client.get('/item/search', params={'q': 'gp_'}).json()) == ['B2-001']
+    assert kodes(client.get('/item/search', params={'q': 'kopi', 'limit': 1}).json()) == ['KOPI']
+    assert client.get('/item/search', params={'q': '%'}).json() == []
+    assert client.get('/item/search', params={'q': 'aren'}).json() == []
+
+    response = client.post('/graphql', json={'query': '{ search(query: "kopi susu") { code effectivePrice } }'})
+    assert response.status_code == 200
+    assert response.json() == {'data': {'search': [{'code': 'A1-003', 'effectivePrice': 800.0}]}}
+
+
+def test_barcode_forms(database):
+    seed(database)
+    client = TestClient(app)
+    # UPC-A dengan atau tanpa nol di depan, EAN-13 dan GTIN-14
+    for code in ('036000291452', '36000291452', '0036000291452', '00036000291452'):
+        response = client.get('/item', params={'code': code})
+        assert response.status_code == 200, code
+        assert response.json()['item']['Kode'] == 'D4-001'
+    assert client.get('/item', params={'code': '36000291453'}).status_code == 404
+
+
+def test_batch(database):
+    seed(database)
+    client = TestClient(app)
+    codes = ['A1-003', '8990000000105', 'C3-001', 'NOPE', '36000291452', 'A1-003']
+
+    response = client.post('/item/batch', json={'codes': codes})
+    assert response.status_code == 200
+    batch = response.json()
+    # urut sesuai permintaan, kode yang sama sekali saja
+    assert list(batch['items']) == ['A1-003', '8990000000105', '36000291452']
+    assert [plu['item']['IDItem'] for plu in batch['items'].values()] == [2, 1, 6]
+    assert batch['items']['A1-003']['hargaEfektif'] == 800
+    assert [tier['Harga'] for tier in batch['items']['A1-003']['hargaGrosir']] == [850]
+    assert batch['errors'] == {'C3-001': inactive_message('C3-001'), 'NOPE': not_found_message('NOPE')}
+
+    with price_cache_loaded() as cache:
+        assert cache.ready
+        assert client.post('/item/batch', json={'codes': codes}).json() == batch
+
+    response = client.post('/graphql', json={
+        'query': '{ plus(barcodes: ["A1-003", "NOPE"]) { barcode error item { code effectivePrice } } }',
+    })
+    assert response.json() == {'data': {'plus': [
+        {'barcode': 'A1-003', 'error': None, 'item': {'code': 'A1-003', 'effectivePrice': 800.0}},
+        {'barcode': 'NOPE', 'error': not_found_message('NOPE'), 'item': None},
+    ]}}
+
+
+def test_batch_size_limit(database, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'plu_batch_max_codes', 2)
+    client = TestClient(app)
+    assert client.post('/item/batch', json={'codes': ['A', 'B', 'C']}).status_code == 400
+    assert client.post('/item/batch', json={'codes': ['A', 'B']}).status_code == 200
+
+
+def test_barcode_before_kode(database):
+    seed(database)
+    client = TestClient(app)
+    expected = {'8990000000105': 1, '36000291452': 6, '0036000291452': 6, 'B2-001': 3, 'KOPI': 4}
+
+    def item_ids() -> dict:
+        return {code: client.get('/item', params={'code': code}).json()['item']['IDItem'] for code in expected}
+
+    # barcode sama, lalu bentuk EAN/UPC lain, baru kode
+    assert item_ids() == expected
+    with price_cache_loaded():
+        assert item_ids() == expected
+
+    # setiap kolom dicari dengan probe sendiri, bukan OR
+    statement = str(item_id_select('8990000000105').compile())
+    assert statement.count('UNION ALL') == 2
+    assert ' OR ' not in statement
+
+
+def test_price_at_date(database):
+    seed(database)
+    client = TestClient(app)
+    today = date.today()
+    expected = {
+        None: ([], 900),
+        today - timedelta(1): (['P0'], 600),
+        today + timedelta(10): (['P2'], 700),
+        today + timedelta(12): (['P2'], 700),
+        today + timedelta(13): ([], 900),
+    }
+
+    def prices(at) -> tuple:
+        params = {'code': 'A1-002'}
+        if at is not None:
+            params['at'] = at.isoformat()
+        plu = client.get('/item', params=params).json()
+        return [promo['Kode'] for promo in plu['hargaPromo']], plu['hargaEfektif']
+
+    assert {at: prices(at) for at in expected} == expected
+    # tanggal sebelum snapshot dibaca dari database
+    with price_cache_loaded():
+        assert {at: prices(at) for at in expected} == expected
+
+    at = (today + timedelta(10)).isoformat()
+    response = client.post('/item/batch', params={'at': at}, json={'codes': ['A1-002', 'A1-003']})
+    assert {code: plu['hargaEfektif'] for code, plu in response.json()['items'].items()} == {
+        'A1-002': 700, 'A1-003': 900,
+    }
+
+    response = client.post('/graphql', json={'query': """{
+        plu(barcode: "A1-002", at: "%s") { promoPrices { promoCode } effectivePrice }
+        plus(barcodes: ["A1-002"], at: "%s") { item { effectivePrice } }
+    }""" % (at, at)})
+    assert response.json() == {'data': {
+        'plu': {'promoPrices': [{'promoCode': 'P2'}], 'effectivePrice': 700.0},
+        'plus': [{'item': {'effectivePrice': 700.0}}],
+    }}
@@ -0,0 +1,46 @@
+from datetime import date
+
+from plu_app.models import ItemModel, ItemHargaPromoModel, PluModel, effective_price, promo_price
+
+
+def promo(kode: str, harga: float = 0.0, diskon: float = 0.0, diskon_persen: float = 0.0) -> ItemHargaPromoModel:
+    return ItemHargaPromoModel(
+        IDItemHargaD=1, IDItemHargaH=1, IDItem=1, Kode=kode, Nama='Promo ' + kode,
+        TanggalAwal=date(2026, 1, 1), TanggalAkhir=date(2026, 1, 31),
+        HargaJual=harga, Diskon=diskon, DiskonPersen=diskon_persen,
+    )
+
+
+def test_promo_price():
+    assert promo_price(1000, 800, 0, 0) == 800
+    # HargaJual didahulukan dari diskon
+    assert promo_price(1000, 800, 300, 50) == 800
+    assert promo_price(1000, 0, 150, 0) == 850
+    assert promo_price(1000, 0, 150, 50) == 850
+    assert promo_price(1000, 0, 0, 25) == 750
+    assert promo_price(100, 0, 150, 0) == 0
+    assert promo_price(1000, 0, 0, 0) is None
+
+
+def test_effective_price():
+    assert effective_price(900, 1000, []) == 900
+    assert effective_price(None, 1000, []) == 1000
+    assert effective_price(0, 1000, []) == 1000
+    assert effective_price(900, 1000, [(800, 0, 0)]) == 800
+    assert effective_price(900, 1000, [(0, 200, 0)]) == 800
+    assert effective_price(900, 1000, [(0, 0, 30)]) == 700
+    # promo tanpa harga dan diskon diabaikan
+    assert effective_price(900, 1000, [(0, 0, 0)]) == 900
+    # diskon dari HargaNormal tidak menaikkan harga
+    assert effective_price(900, 1000, [(0, 50, 0)]) == 900
+
+
+def test_plu_harga_efektif():
+    item = ItemModel(IDItem=1, Kode='A1', HargaNormal=1000, HargaJual=950)
+    assert PluModel(item=item).hargaEfektif == 950
+    assert PluModel(item=item, hargaPromo=[promo('P1', harga=900)]).hargaEfektif == 900
+    assert PluModel(item=item, hargaPromo=[promo('P1', diskon=120)]).hargaEfektif == 880
+    assert PluModel(item=item, hargaPromo=[promo('P1', diskon_persen=10)]).hargaEfektif == 900
+    assert PluModel(item=item, hargaPromo=[
+        promo('P1', harga=900), promo('P2', diskon_persen=20), promo('P3', diskon=100),
+    ]).hargaEfektif == 800
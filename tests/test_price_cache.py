@@ -0,0 +1,154 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from plu_app.price_cache import PriceCache
+from plu_app.schema import metadata, Item, ItemHarga, ItemHargaD, ItemHargaGrosir
+from plu_app.settings import get_settings
+
+
+pytest.importorskip('aiosqlite')
+
+INSERTED = datetime(2026, 1, 1)
+
+
+async def seed(session: AsyncSession) -> None:
+    today = date.today()
+    session.add_all([
+        Item(IDItem=1, Kode='A1', Barcode='111', Nama='Satu', HargaNormal=10, HargaJual=9, Aktif='Ya', InsertTime=INSERTED),
+        Item(IDItem=2, Kode='A2', Barcode='222', Nama='Dua', HargaNormal=20, HargaJual=19, Aktif='Ya', InsertTime=INSERTED),
+        Item(IDItem=3, Kode='A3', Barcode='333', Nama='Tiga', HargaNormal=30, HargaJual=29, Aktif='Ya', InsertTime=INSERTED),
+        ItemHargaGrosir(IDItemHargaGrosir=1, IDItem=1, Jumlah=5, Harga=8.5, IsDos='Tidak', Aktif='Ya'),
+        ItemHargaGrosir(IDItemHargaGrosir=2, IDItem=1, Jumlah=10, Harga=8, IsDos='Tidak', Aktif='Ya'),
+        ItemHargaGrosir(IDItemHargaGrosir=3, IDItem=3, Jumlah=6, Harga=27, IsDos='Ya', Aktif='Ya'),
+        ItemHarga(
+            IDItemHargaH=1, Kode='P1', Nama='Promo', TanggalAwal=today, TanggalAkhir=today + timedelta(3),
+            Aktif='Ya', InsertTime=INSERTED,
+        ),
+        ItemHargaD(IDItemHargaD=1, IDItemHargaH=1, IDItem=1, HargaJual=7, DiskonPersen=0, Diskon=3),
+        ItemHargaD(IDItemHargaD=2, IDItemHargaH=1, IDItem=2, HargaJual=15, DiskonPersen=0, Diskon=5),
+    ])
+    await session.commit()
+
+
+async def refresh_while_looking_up(cache: PriceCache, session: AsyncSession) -> None:
+    refreshing = asyncio.ensure_future(cache.refresh(session))
+    while not refreshing.done():
+        # dijalankan di antara query refresh
+        cache.lookup_json('111')
+        cache.lookup_json('222')
+        cache.lookup_json('333')
+        cache.lookup('333')
+        await asyncio.sleep(0)
+    await refreshing
+
+
+def prices(cache: PriceCache, code: str):
+    plu = json.loads(cache.lookup_json(code))
+    return (
+        [tier['Harga'] for tier in plu['hargaGrosir']],
+        [promo['HargaJual'] for promo in plu['hargaPromo']],
+    )
+
+
+async def run_refresh_alongside_lookups(path: str) -> None:
+    engine = create_async_engine('sqlite+aiosqlite:///' + path)
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.create_all)
+
+    async with AsyncSession(engine) as session:
+        await seed(session)
+        cache = PriceCache()
+        await cache.load(session)
+        assert prices(cache, '111') == ([8.5, 8], [7])
+
+        # item dan promo dengan InsertTime = watermark dimuat ulang di setiap poll
+        for _ in range(3):
+            await refresh_while_looking_up(cache, session)
+            assert prices(cache, '111') == ([8.5, 8], [7])
+            assert prices(cache, '222') == ([], [15])
+            assert prices(cache, '333') == ([27], [])
+
+        await session.execute(update(ItemHargaGrosir).where(ItemHargaGrosir.IDItemHargaGrosir == 2).values(Harga=7.5))
+        await session.execute(update(Item).where(Item.IDItem == 1).values(UpdateTime=datetime.now()))
+        await session.execute(update(ItemHargaD).where(ItemHargaD.IDItemHargaD == 2).values(HargaJual=14))
+        await session.execute(update(ItemHarga).where(ItemHarga.IDItemHargaH == 1).values(UpdateTime=datetime.now()))
+        await session.commit()
+
+        await refresh_while_looking_up(cache, session)
+        assert prices(cache, '111') == ([8.5, 7.5], [7])
+        assert prices(cache, '222') == ([], [14])
+        assert prices(cache, '333') == ([27], [])
+
+        # kode lama barang yang berubah tidak lagi ditemukan di store
+        await session.execute(update(Item).where(Item.IDItem == 2).values(Barcode='2220', UpdateTime=datetime.now()))
+        await session.commit()
+        await cache.refresh(session)
+        assert cache.find('222') is None
+        assert cache.find('2220') == 2
+        assert cache.find('A2') == 2
+        assert cache.find('111') == 1
+        assert cache.find('A3') == 3
+
+        # PLU yang sudah dirakit dipakai ulang sampai barangnya berubah
+        plu = cache.lookup('111')
+        assert cache.get_plu(1) is plu
+        assert [tier.Harga for tier in plu.hargaGrosir] == [8.5, 7.5]
+        assert [tier.Harga for tier in cache.lookup('333').hargaGrosir] == [27]
+        assert cache.get_plu(1, date.today() + timedelta(1)) is not plu
+
+        settings = get_settings()
+        size = settings.price_cache_plu_size
+        settings.price_cache_plu_size = 2
+        try:
+            cache.plus.clear()
+            cache.get_plu(2)
+            cache.get_plu(1)
+            cache.get_plu(2)
+            cache.get_plu(3)
+            assert list(cache.plus) == [2, 3]
+        finally:
+            settings.price_cache_plu_size = size
+
+    await engine.dispose()
+
+
+def test_refresh_alongside_lookups(tmp_path):
+    asyncio.run(run_refresh_alongside_lookups(str(tmp_path / 'plu.db')))
+
+
+async def run_refresh_without_timestamps(path: str) -> None:
+    engine = create_async_engine('sqlite+aiosqlite:///' + path)
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.create_all)
+
+    async with AsyncSession(engine) as session:
+        session.add_all([
+            Item(IDItem=1, Kode='A1', Barcode='111', Nama='Satu', HargaNormal=10, HargaJual=9, Aktif='Ya'),
+            Item(IDItem=2, Kode='A2', Barcode='222', Nama='Dua', HargaNormal=20, HargaJual=19, Aktif='Ya'),
+        ])
+        await session.commit()
+        cache = PriceCache()
+        await cache.load(session)
+        # tanpa timestamp, watermark dari waktu muat
+        assert cache.item_watermark is not None
+        assert cache.promo_watermark is not None
+
+        # barang tanpa timestamp tidak dibaca ulang di setiap poll
+        await session.execute(update(Item).where(Item.IDItem == 1).values(Nama='Satu Baru'))
+        session.add(Item(IDItem=3, Kode='A3', Nama='Tiga', HargaNormal=30, Aktif='Ya', InsertTime=datetime.now()))
+        await session.commit()
+        await cache.refresh(session)
+        assert list(cache.changed_items) == [3]
+        assert cache.lookup('A1').item.Nama == 'Satu'
+        assert cache.lookup('A3').item.Nama == 'Tiga'
+
+    await engine.dispose()
+
+
+def test_refresh_without_timestamps(tmp_path):
+    asyncio.run(run_refresh_without_timestamps(str(tmp_path / 'plu.db')))
@@ -0,0 +1,104 @@
+from datetime import date
+
+from plu_app.models import ItemHargaPromoModel
+from plu_app.promo_index import PromoIndex, PromoWindows
+
+
+def promo(header_id: int, item_id: int, kode: str, awal: date, akhir: date, harga: float = 0.0) -> ItemHargaPromoModel:
+    return ItemHargaPromoModel(
+        IDItemHargaD=header_id * 100 + item_id,
+        IDItemHargaH=header_id,
+        IDItem=item_id,
+        Kode=kode,
+        Nama='Promo ' + kode,
+        TanggalAwal=awal,
+        TanggalAkhir=akhir,
+        HargaJual=harga,
+    )
+
+
+def kodes(promos) -> list:
+    return [promo.Kode for promo in promos]
+
+
+def test_windows_of_overlapping_promos():
+    # P1 1-10, P2 5-15, keduanya berlaku 5-10
+    windows = PromoWindows([
+        promo(2, 1, 'P2', date(2026, 1, 5), date(2026, 1, 15)),
+        promo(1, 1, 'P1', date(2026, 1, 1), date(2026, 1, 10)),
+    ])
+    assert windows.starts == [date(2026, 1, 1), date(2026, 1, 5), date(2026, 1, 11), date(2026, 1, 16)]
+    assert kodes(windows.at(date(2025, 12, 31))) == []
+    assert kodes(windows.at(date(2026, 1, 1))) == ['P1']
+    assert kodes(windows.at(date(2026, 1, 4))) == ['P1']
+    assert kodes(windows.at(date(2026, 1, 5))) == ['P1', 'P2']
+    assert kodes(windows.at(date(2026, 1, 10))) == ['P1', 'P2']
+    assert kodes(windows.at(date(2026, 1, 11))) == ['P2']
+    assert kodes(windows.at(date(2026, 1, 15))) == ['P2']
+    assert kodes(windows.at(date(2026, 1, 16))) == []
+
+
+def test_windows_of_open_ended_promo():
+    windows = PromoWindows([promo(1, 1, 'P1', date(2026, 1, 1), date.max)])
+    assert windows.starts == [date(2026, 1, 1)]
+    assert kodes(windows.at(date(2025, 12, 31))) == []
+    assert kodes(windows.at(date(2026, 1, 1))) == ['P1']
+    assert kodes(windows.at(date.max)) == ['P1']
+
+
+def test_changes_between():
+    windows = PromoWindows([promo(1, 1, 'P1', date(2026, 1, 5), date(2026, 1, 10))])
+    assert not windows.changes_between(date(2026, 1, 1), date(2026, 1, 4))
+    assert windows.changes_between(date(2026, 1, 4), date(2026, 1, 5))
+    assert not windows.changes_between(date(2026, 1, 5), date(2026, 1, 10))
+    assert windows.changes_between(date(2026, 1, 10), date(2026, 1, 11))
+    # urutan tanggal tidak berpengaruh
+    assert windows.changes_between(date(2026, 1, 11), date(2026, 1, 10))
+    assert not windows.changes_between(date(2026, 1, 11), date(2026, 2, 1))
+
+
+def test_index_at_and_changed_between():
+    index = PromoIndex()
+    index.put(promo(1, 1, 'P1', date(2026, 1, 1), date(2026, 1, 10), 7))
+    index.put(promo(1, 2, 'P1', date(2026, 1, 1), date(2026, 1, 10), 8))
+    index.put(promo(2, 2, 'P2', date(2026, 1, 8), date.max, 6))
+    assert len(index) == 2
+    assert kodes(index.at(1, date(2026, 1, 5))) == ['P1']
+    assert kodes(index.at(2, date(2026, 1, 9))) == ['P1', 'P2']
+    assert kodes(index.at(3, date(2026, 1, 9))) == []
+
+    assert index.changed_between(date(2026, 1, 2), date(2026, 1, 3)) == set()
+    assert index.changed_between(date(2026, 1, 7), date(2026, 1, 8)) == {2}
+    assert index.changed_between(date(2026, 1, 10), date(2026, 1, 11)) == {1, 2}
+
+    # windows dibangun ulang setelah put
+    index.put(promo(3, 1, 'P0', date(2026, 1, 3), date(2026, 1, 3), 5))
+    assert kodes(index.at(1, date(2026, 1, 3))) == ['P0', 'P1']
+
+
+def test_index_remove():
+    index = PromoIndex()
+    index.put(promo(1, 1, 'P1', date(2026, 1, 1), date(2026, 1, 10)))
+    index.put(promo(1, 2, 'P1', date(2026, 1, 1), date(2026, 1, 10)))
+    index.put(promo(2, 2, 'P2', date(2026, 1, 1), date(2026, 1, 10)))
+    assert kodes(index.at(2, date(2026, 1, 5))) == ['P1', 'P2']
+
+    assert index.remove(1) == {1, 2}
+    assert index.at(1, date(2026, 1, 5)) == []
+    assert kodes(index.at(2, date(2026, 1, 5))) == ['P2']
+    assert 1 not in index.promos
+    assert index.remove(1) == set()
+    assert len(index) == 1
+
+
+def test_index_remove_ended():
+    index = PromoIndex()
+    index.put(promo(1, 1, 'P1', date(2026, 1, 1), date(2026, 1, 10)))
+    index.put(promo(2, 2, 'P2', date(2026, 1, 1), date(2026, 1, 11)))
+    index.put(promo(3, 3, 'P3', date(2026, 1, 1), date.max))
+
+    assert index.remove_ended(date(2026, 1, 10)) == set()
+    assert index.remove_ended(date(2026, 1, 11)) == {1}
+    assert index.remove_ended(date(2026, 1, 12)) == {2}
+    assert set(index.promos) == {3}
+    assert kodes(index.at(3, date(2030, 1, 1))) == ['P3']
@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from plu_app.replica import create_replica_schema, full_sync, read_state, sync_changes
+from plu_app.schema import metadata, Item
+
+
+pytest.importorskip('aiosqlite')
+
+
+async def run_sync_without_timestamps(source_path: str, replica_path: str) -> None:
+    source_engine = create_async_engine('sqlite+aiosqlite:///' + source_path)
+    replica_engine = create_async_engine('sqlite+aiosqlite:///' + replica_path)
+    async with source_engine.begin() as source:
+        await source.run_sync(metadata.create_all)
+        await source.execute(Item.__table__.insert(), [
+            dict(IDItem=1, Kode='A1', Nama='Satu', HargaNormal=10, Aktif='Ya'),
+            dict(IDItem=2, Kode='A2', Nama='Dua', HargaNormal=20, Aktif='Ya'),
+        ])
+
+    async with source_engine.begin() as source, replica_engine.begin() as replica:
+        await replica.run_sync(create_replica_schema)
+        await full_sync(source, replica)
+        # tanpa timestamp, watermark dari waktu sinkronisasi
+        assert await read_state(replica, 'item_watermark') is not None
+        assert await read_state(replica, 'promo_watermark') is not None
+
+        # barang tanpa timestamp tidak disalin ulang di setiap sinkronisasi
+        await source.execute(update(Item).where(Item.IDItem == 1).values(Nama='Satu Baru'))
+        await source.execute(Item.__table__.insert().values(
+            IDItem=3, Kode='A3', Nama='Tiga', HargaNormal=30, Aktif='Ya', InsertTime=datetime.now(),
+        ))
+        await sync_changes(source, replica)
+        names = dict((await replica.execute(select(Item.IDItem, Item.Nama))).all())
+        assert names == {1: 'Satu', 2: 'Dua', 3: 'Tiga'}
+
+    await source_engine.dispose()
+    await replica_engine.dispose()
+
+
+def test_sync_without_timestamps(tmp_path):
+    asyncio.run(run_sync_without_timestamps(str(tmp_path / 'source.db'), str(tmp_path / 'replica.db')))
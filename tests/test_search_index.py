@@ -0,0 +1,115 @@
+from plu_app.models import ItemModel
+from plu_app.search_index import Postings, SearchIndex, query_grams, item_words
+
+
+def item(item_id: int, kode: str, nama: str, **values) -> ItemModel:
+    return ItemModel(IDItem=item_id, Kode=kode, Nama=nama, **values)
+
+
+ITEMS = [
+    item(1, 'A1-002', 'Kopi Bubuk Kapal Api 165g'),
+    item(2, 'A1-003', 'Kopi Susu Sachet'),
+    item(3, 'B2-001', 'Gula Pasir 1kg', KodePabrik='GP001'),
+    item(4, 'B2-002', 'Gula Aren Cair'),
+    item(5, 'KOPI', 'Teh Celup Kotak', Singkatan='TEH'),
+    item(6, 'C3-001', 'Kopi Susu Gula Aren Kemasan Botol 250ml'),
+]
+
+
+def ids(results) -> list:
+    return [item_id for item_id, _ in results]
+
+
+def test_words_and_grams():
+    assert item_words(ITEMS[0]) == {'kopi', 'bubuk', 'kapal', 'api', '165g', 'a1', '002', 'a1002'}
+    assert query_grams('k') == {' k'}
+    assert query_grams('Ko') == {' ko'}
+    assert query_grams('kopi') == {' ko', 'kop', 'opi'}
+
+
+def test_build():
+    postings = Postings.build(reversed(ITEMS))
+    assert list(postings.item_ids) == [1, 2, 3, 4, 5, 6]
+    assert len(postings) == 6
+    assert postings.find(3) == 2
+    assert postings.find(7) is None
+    # setiap posting berisi nomor baris yang urut
+    assert list(postings.get(' ko')) == [0, 1, 4, 5]
+    assert list(postings.get('zzz')) == []
+    assert list(postings.find_code('gp001')) == [2]
+    assert list(postings.find_code('kopi')) == [4]
+
+
+def test_ranking():
+    index = SearchIndex(Postings.build(ITEMS))
+    results = index.search('kopi', 10)
+    # kode yang sama persis lebih dulu, lalu barang yang lebih pendek
+    assert results[0] == (5, 2.0)
+    assert ids(results) == [5, 2, 1, 6]
+    assert [score for _, score in results[1:]] == [1.0, 1.0, 1.0]
+
+    # kata dalam urutan apa pun, lalu yang punya separuh trigram
+    assert index.search('susu kopi', 10) == [(2, 1.0), (6, 1.0), (5, 0.5), (1, 0.5)]
+    assert ids(index.search('kopi susu', 1)) == [2]
+    assert index.search('gula aren', 10) == [(4, 1.0), (6, 1.0), (3, 0.5)]
+    assert index.search('', 10) == []
+    assert index.search('kopi', 0) == []
+
+
+def test_partial_match():
+    index = SearchIndex(Postings.build(ITEMS))
+    # salah ketik, tidak semua trigram ada
+    assert index.search('kopi sisu', 10) == [(5, 0.5), (2, 0.5), (1, 0.5), (6, 0.5)]
+    assert index.search('kopi sisu', 2) == [(5, 0.5), (2, 0.5)]
+    assert index.search('teh xy', 10) == [(5, 2 / 3)]
+    assert index.search('teh xyzw', 10) == []
+    assert index.search('zzzz', 10) == []
+
+
+def test_code_match():
+    index = SearchIndex(Postings.build(ITEMS))
+    assert index.search('A1-002', 10)[0] == (1, 2.0)
+    assert index.search(' a1-002 ', 10)[0] == (1, 2.0)
+    # kode tanpa pemisah dan kode pabrik
+    assert ids(index.search('a1002', 10))[0] == 1
+    assert index.search('gp001', 10)[0] == (3, 2.0)
+    assert index.search('b2', 10) == [(4, 1.0), (3, 1.0)]
+
+
+def test_put_and_remove():
+    index = SearchIndex(Postings.build(ITEMS))
+    assert len(index) == 6
+
+    index.remove(2)
+    assert len(index) == 5
+    assert 2 not in ids(index.search('kopi susu', 10))
+    assert ids(index.search('susu', 10)) == [6]
+
+    # barang yang berubah menggantikan baris lamanya
+    index.put(item(1, 'A1-002', 'Teh Melati'))
+    index.put(item(7, 'D4-001', 'Kopi Susu Jahe', KodePabrik='KSJ'))
+    assert len(index) == 6
+    assert ids(index.search('kopi', 10)) == [5, 7, 6]
+    assert ids(index.search('teh', 10)) == [5, 1]
+    assert index.search('a1-002', 10)[0] == (1, 2.0)
+    assert index.search('ksj', 10)[0] == (7, 2.0)
+
+    index.put(item(7, 'D4-001', 'Jahe Merah'))
+    assert index.search('kopi susu', 10) == [(6, 1.0), (5, 0.5)]
+    assert index.search('ksj', 10) == []
+
+    index.remove(7)
+    index.remove(5)
+    index.remove(99)
+    assert len(index) == 4
+    assert index.search('jahe', 10) == []
+    assert index.search('kopi', 10) == [(6, 1.0)]
+
+
+def test_empty_index():
+    index = SearchIndex()
+    assert len(index) == 0
+    assert index.search('kopi', 10) == []
+    index.put(ITEMS[1])
+    assert index.search('kopi', 10) == [(2, 1.0)]
+    assert len(index) == 1
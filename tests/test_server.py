@@ -0,0 +1,33 @@
+import os
+
+from plu_app.server import CATALOG_STORE_ENV, READY_DIR_ENV, mark_worker_ready, ready_pids, share_catalog_store
+
+
+def test_share_catalog_store(tmp_path, monkeypatch):
+    monkeypatch.delenv(CATALOG_STORE_ENV, raising=False)
+    share_catalog_store(1, str(tmp_path))
+    assert CATALOG_STORE_ENV not in os.environ
+
+    share_catalog_store(4, str(tmp_path))
+    assert os.environ[CATALOG_STORE_ENV] == str(tmp_path / 'catalog.bin')
+
+    # path yang sudah diatur tidak diganti
+    monkeypatch.setenv(CATALOG_STORE_ENV, '/srv/plu/catalog.bin')
+    share_catalog_store(4, str(tmp_path))
+    assert os.environ[CATALOG_STORE_ENV] == '/srv/plu/catalog.bin'
+
+
+def test_mark_worker_ready(tmp_path, monkeypatch):
+    monkeypatch.delenv(READY_DIR_ENV, raising=False)
+    mark_worker_ready()
+    assert ready_pids(str(tmp_path)) == []
+
+    monkeypatch.setenv(READY_DIR_ENV, str(tmp_path))
+    (tmp_path / 'catalog.bin').touch()
+    mark_worker_ready()
+    assert ready_pids(str(tmp_path)) == [os.getpid()]
+
+    # folder yang sudah dihapus server tidak dibuat ulang
+    monkeypatch.setenv(READY_DIR_ENV, str(tmp_path / 'gone'))
+    mark_worker_ready()
+    assert not (tmp_path / 'gone').exists()
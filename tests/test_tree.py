@@ -0,0 +1,75 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from plu_app.item_tree import get_tree_index
+from plu_app.main import app
+from plu_app.schema import Item, ItemTree, ItemHargaGrosir
+
+
+def tree(tree_id: int, path: str, kode: str, nama: str) -> ItemTree:
+    return ItemTree(IDItemTree=tree_id, TreePath=path, Kode=kode, Nama=nama, FullPath=nama)
+
+
+def item(item_id: int, kode: str, tree_id: int, aktif: str = 'Ya') -> Item:
+    return Item(
+        IDItem=item_id, Kode=kode, Nama='Barang ' + kode, IDItemTree=tree_id, HargaNormal=1000, HargaJual=900,
+        Aktif=aktif, InsertTime=datetime(2026, 1, 1),
+    )
+
+
+@pytest.fixture
+def client(database):
+    database.add_all([
+        tree(1, '01.', 'MKN', 'Makanan'),
+        tree(2, '01.02.', 'SNK', 'Snack'),
+        tree(3, '01.01.', 'ROT', 'Roti'),
+        tree(4, '02.', 'MNM', 'Minuman'),
+        tree(5, '01.01.01.', 'RTM', 'Roti Manis'),
+        item(1, 'B3', 1),
+        item(2, 'B1', 5),
+        item(3, 'B2', 2),
+        item(4, 'B4', 4),
+        item(5, 'B5', 3, aktif='Tidak'),
+        item(6, 'A9', 3),
+        ItemHargaGrosir(IDItemHargaGrosir=1, IDItem=6, Jumlah=10, Harga=850, IsDos='Tidak', Aktif='Ya'),
+    ])
+    database.commit()
+    get_tree_index.cache_clear()
+    yield TestClient(app)
+    get_tree_index.cache_clear()
+
+
+def kodes(trees) -> list:
+    return [tree['Kode'] for tree in trees]
+
+
+def test_trees(client):
+    response = client.get('/tree')
+    assert response.status_code == 200
+    assert kodes(response.json()) == ['MKN', 'ROT', 'RTM', 'SNK', 'MNM']
+
+    assert kodes(client.get('/tree', params={'root': 'MKN'}).json()) == ['MKN', 'ROT', 'RTM', 'SNK']
+    assert kodes(client.get('/tree', params={'root': 'ROT'}).json()) == ['ROT', 'RTM']
+    assert kodes(client.get('/tree', params={'root': 'MNM'}).json()) == ['MNM']
+    assert client.get('/tree', params={'root': 'NOPE'}).status_code == 404
+
+
+def test_tree_items(client):
+    response = client.get('/tree/ROT/items')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    plus = [json.loads(line) for line in response.text.splitlines()]
+    # urut per kategori lalu Kode, barang tidak aktif tidak ikut
+    assert [plu['item']['Kode'] for plu in plus] == ['A9', 'B1']
+    assert [tier['Harga'] for tier in plus[0]['hargaGrosir']] == [850]
+
+    response = client.get('/tree/MKN/items', params={'format': 'csv'})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith('IDItem,Kode,')
+    assert [line.split(',')[1] for line in lines[1:]] == ['B3', 'A9', 'B1', 'B2']
+
+    assert client.get('/tree/NOPE/items').status_code == 404